@@ -0,0 +1,7 @@
+# app/backend/__main__.py
+import sys
+
+from app.backend.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# app/backend/cli.py
+"""
+Headless command line for the validator.
+
+    python -m app.backend validate proxies.txt other.ndjson -o results.ndjson
+    cat proxies.txt | python -m app.backend validate --format csv --deadline 300
+    python -m app.backend serve --workers 4
+    python -m app.backend shard-worker --connect coordinator-host:7800
+
+Input lines may be `ip:port`, proxy URLs (`socks5://ip:port`) or NDJSON objects with
+ProxyItem fields. Input is read lazily and results are written as soon as each probe
+completes, so very large lists run in constant memory.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import sys
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Iterable, Iterator, TextIO
+from urllib.parse import urlparse
+
+from pydantic import ValidationError
+
+from app.backend.models import ProxyItem
+
+SUPPORTED_PROTOCOLS = ("http", "https", "socks4", "socks5")
+DEDUPE_WINDOW = 100_000 # Recently seen (ip, port, protocol) keys remembered to drop repeats
+QUEUE_CAPACITY_PER_THREAD = 8
+CSV_FIELDS = ["ip", "port", "protocol", "is_valid", "response_time", "anonymity", "country",
+              "last_checked", "source", "verified_protocols", "probe_trace"]
+
+
+def parse_proxy_line(line: str, default_protocol: str, source: str) -> Optional[ProxyItem]:
+    """Parses one input line; returns None for blank lines and comments. Raises ValueError if malformed."""
+    line = line.strip()
+    if not line or line.startswith("#"): return None
+    if line.startswith("{"):
+        data = json.loads(line)
+        data.setdefault("protocol", default_protocol)
+        data.setdefault("source", source)
+        data["protocol"] = str(data["protocol"]).lower()
+        return ProxyItem(**data)
+    if "://" in line:
+        parsed = urlparse(line)
+        protocol, ip, port = (parsed.scheme or "").lower(), parsed.hostname, parsed.port
+    else:
+        ip, _, port_str = line.rpartition(":")
+        protocol, port = default_protocol, int(port_str)
+    if not ip or port is None or protocol not in SUPPORTED_PROTOCOLS:
+        raise ValueError(f"unsupported proxy line {line!r}")
+    return ProxyItem(ip=ip, port=port, protocol=protocol, source=source)
+
+
+def iter_input_proxies(paths: List[str], default_protocol: str, stats: Dict[str, int]) -> Iterator[ProxyItem]:
+    """
+    Lazily reads proxies from files ('-' is stdin), dropping repeats seen within DEDUPE_WINDOW.
+    Files that cannot be opened are reported, counted in stats["unreadable_files"] and skipped.
+    """
+    recently_seen: "OrderedDict[tuple, None]" = OrderedDict()
+    for path in paths or ["-"]:
+        source = "cli:stdin" if path == "-" else f"cli:{path}"
+        try:
+            stream_context = contextlib.nullcontext(sys.stdin) if path == "-" else open(path, "r", encoding="utf-8")
+        except OSError as e:
+            stats["unreadable_files"] += 1
+            print(f"[CLI_ERROR] Cannot read {path}: {e.strerror or e}", file=sys.stderr)
+            continue
+        with stream_context as stream:
+            for line_number, line in enumerate(stream, 1):
+                try:
+                    item = parse_proxy_line(line, default_protocol, source)
+                except (ValueError, ValidationError) as e:
+                    stats["invalid_lines"] += 1
+                    print(f"[CLI_WARNING] {source}:{line_number}: skipping line: {e}", file=sys.stderr)
+                    continue
+                if item is None: continue
+                key = (item.ip, item.port, item.protocol)
+                if key in recently_seen:
+                    stats["duplicates"] += 1; recently_seen.move_to_end(key); continue
+                recently_seen[key] = None
+                if len(recently_seen) > DEDUPE_WINDOW: recently_seen.popitem(last=False)
+                stats["read"] += 1
+                yield item
+
+
+class ResultWriter:
+    """Writes validated proxies incrementally as NDJSON or CSV."""
+
+    def __init__(self, stream: TextIO, output_format: str):
+        self.stream = stream
+        self.output_format = output_format
+        self._csv_writer: Optional[csv.DictWriter] = None
+        if output_format == "csv":
+            self._csv_writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            self._csv_writer.writeheader()
+
+    def write(self, item: ProxyItem):
+        record: Dict[str, Any] = item.model_dump()
+        if self._csv_writer is not None:
+            for list_field in ("verified_protocols", "probe_trace"):
+                if record.get(list_field) is not None:
+                    record[list_field] = "|".join("" if v is None else str(v) for v in record[list_field])
+            self._csv_writer.writerow(record)
+        else:
+            self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+
+def run_validate(args: argparse.Namespace) -> int:
+    # The validator reports progress with print(); keep stdout clean for results
+    results_stream = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    input_stats = {"read": 0, "invalid_lines": 0, "duplicates": 0, "unreadable_files": 0}
+    run_stats: Dict[str, Any] = {}
+    written = valid = 0
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            from app.backend.proxy_validator import iter_validated_proxies, ANONYMITY_TEST_URL
+
+            writer = ResultWriter(results_stream, args.format)
+            candidates = iter_input_proxies(args.inputs, args.default_protocol, input_stats)
+            for item in iter_validated_proxies(
+                candidates, num_threads=args.threads, timeout=args.timeout, test_url=args.test_url,
+                anonymity_test_url=ANONYMITY_TEST_URL, check_anonymity=not args.no_anonymity,
+                deadline_seconds=args.deadline, run_stats=run_stats, fingerprint=args.fingerprint,
+                collect_traces=args.trace, queue_capacity=max(1, args.threads * QUEUE_CAPACITY_PER_THREAD),
+            ):
+                if item.is_valid: valid += 1
+                if args.only_valid and not item.is_valid: continue
+                writer.write(item)
+                written += 1
+    except KeyboardInterrupt:
+        print("[CLI] Interrupted; results written so far are kept.", file=sys.stderr)
+    finally:
+        if results_stream is not sys.stdout: results_stream.close()
+
+    print(f"[CLI] Read {input_stats['read']} proxies ({input_stats['invalid_lines']} invalid lines, "
+          f"{input_stats['duplicates']} duplicates), probed {run_stats.get('completed', 0)}, {valid} valid, "
+          f"wrote {written}. Stop reason: {run_stats.get('stop_reason') or 'completed'}.", file=sys.stderr)
+    if input_stats["unreadable_files"]:
+        print(f"[CLI] {input_stats['unreadable_files']} input files could not be read.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_shard_worker_command(args: argparse.Namespace) -> int:
+    from multiprocessing import AuthenticationError
+    from app.backend.proxy_sharding import run_shard_worker, authkey_from_environ, AUTHKEY_ENV_VAR
+
+    authkey = authkey_from_environ()
+    if not authkey:
+        print(f"[CLI] Set {AUTHKEY_ENV_VAR} to the coordinator's shard key (hex).", file=sys.stderr)
+        return 2
+    host, port = args.connect.rsplit(":", 1)
+    print(f"[CLI] Shard worker connecting to {host}:{port}", file=sys.stderr)
+    try:
+        # Stays connected across sweeps and reconnects with backoff while the coordinator is away
+        run_shard_worker((host, int(port)), authkey, reconnect=True)
+    except AuthenticationError:
+        print(f"[CLI] The coordinator rejected the key in {AUTHKEY_ENV_VAR}.", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("[CLI] Shard worker stopped.", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from app.backend.proxy_validator import DEFAULT_THREADS, REQUEST_TIMEOUT, DEFAULT_TEST_URL
+
+    parser = argparse.ArgumentParser(prog="python -m app.backend", description="Proxy validator command line.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate_parser = subparsers.add_parser("validate", help="Validate proxies read from files or stdin.")
+    validate_parser.add_argument("inputs", nargs="*", help="Input files ('-' or none for stdin).")
+    validate_parser.add_argument("-o", "--output", help="Output file (default: stdout).")
+    validate_parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    validate_parser.add_argument("--default-protocol", choices=SUPPORTED_PROTOCOLS, default="http",
+                                 help="Protocol for plain ip:port lines.")
+    validate_parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    validate_parser.add_argument("--timeout", type=int, default=REQUEST_TIMEOUT, help="Per-probe timeout in seconds.")
+    validate_parser.add_argument("--deadline", type=float, default=None, help="Stop the whole run after this many seconds.")
+    validate_parser.add_argument("--test-url", default=DEFAULT_TEST_URL)
+    validate_parser.add_argument("--no-anonymity", action="store_true", help="Skip the anonymity check.")
+    validate_parser.add_argument("--fingerprint", action="store_true", help="Detect each proxy's real protocol first.")
+    validate_parser.add_argument("--trace", action="store_true", help="Record per-phase probe timings.")
+    validate_parser.add_argument("--only-valid", action="store_true", help="Only write proxies that passed.")
+    validate_parser.set_defaults(handler=run_validate)
+
+    shard_worker_parser = subparsers.add_parser("shard-worker", help="Validate shards for a remote coordinator.")
+    shard_worker_parser.add_argument("--connect", required=True, metavar="HOST:PORT", help="Coordinator address.")
+    shard_worker_parser.set_defaults(handler=run_shard_worker_command)
+
+    # Parsed by serving.main; listed here for --help
+    subparsers.add_parser("serve", help="Multi-worker API server (see serving.py for options).", add_help=False)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "serve":
+        from app.backend.serving import main as serving_main
+        serving_main(argv[1:])
+        return 0
+    with contextlib.redirect_stdout(sys.stderr): # Importing the validator prints its real-IP probe
+        parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.handler(args)
@@ -18,6 +18,8 @@ try:
     # Correctly import DEFAULT_THREADS from proxy_validator
     from app.backend.proxy_validator import DEFAULT_THREADS as DEFAULT_VALIDATION_THREADS_FROM_VALIDATOR
     from app.backend.models import ProxyItem
+    from app.backend.serving import RemoteScheduler, ENV_SERVING_ROLE, WORKER_ROLE
+    from app.backend.probe_trace import trace_as_dict
 except ImportError as e:
     print(f"Error importing backend modules: {e}")
     print(f"Attempted PROJECT_ROOT_CANDIDATE: {PROJECT_ROOT_CANDIDATE}")
@@ -36,6 +38,7 @@ class ProxyItemResponse(BaseModel):
     last_checked: Optional[str] = None
     response_time: Optional[float] = None
     is_valid: bool
+    verified_protocols: Optional[List[str]] = None
 
     @classmethod
     def from_proxy_item(cls, item: ProxyItem) -> "ProxyItemResponse":
@@ -44,7 +47,8 @@ class ProxyItemResponse(BaseModel):
             return cls(**dump_method(exclude_none=True))
         return cls(ip=item.ip, port=item.port, protocol=item.protocol, country=item.country,
                    anonymity=item.anonymity, source=item.source, last_checked=item.last_checked,
-                   response_time=item.response_time, is_valid=item.is_valid)
+                   response_time=item.response_time, is_valid=item.is_valid,
+                   verified_protocols=item.verified_protocols)
 
 class SchedulerStatusResponse(BaseModel):
     status: str
@@ -56,6 +60,15 @@ class SchedulerStatusResponse(BaseModel):
     next_run_time: Optional[str] = None
     current_proxy_count: int
     valid_proxy_count: int
+    snapshot_version: Optional[int] = None
+    snapshot_published_at: Optional[str] = None
+    sweep_deadline_seconds: Optional[int] = None
+    last_run_stats: Optional[Dict[str, Any]] = None
+    collect_traces: bool = False
+    provider_cache: Optional[Dict[str, int]] = None
+    shard_processes: int = 0
+    shard_workers_connected: int = 0
+    negative_cache: Optional[Dict[str, int]] = None
 
 class SetIntervalRequest(BaseModel):
     interval_seconds: int = Field(..., gt=0)
@@ -63,12 +76,23 @@ class SetIntervalRequest(BaseModel):
 class SetThreadsRequest(BaseModel):
     validation_threads: int = Field(..., gt=0, le=200)
 
+class SetTracingRequest(BaseModel):
+    enabled: bool
+
+class SetDeadlineRequest(BaseModel):
+    deadline_seconds: Optional[int] = Field(None, gt=0) # null clears the deadline
+
 # --- Global scheduler instance ---
-scheduler = ProxyScheduler(
-    initial_interval_seconds=DEFAULT_SCHEDULER_INTERVAL,
-    # Use the imported constant for initial_validation_threads
-    initial_validation_threads=DEFAULT_VALIDATION_THREADS_FROM_VALIDATOR,
-)
+# Under serving.py, API workers talk to the scheduler process instead of owning one
+IS_API_WORKER = os.environ.get(ENV_SERVING_ROLE) == WORKER_ROLE
+if IS_API_WORKER:
+    scheduler = RemoteScheduler.from_environ()
+else:
+    scheduler = ProxyScheduler(
+        initial_interval_seconds=DEFAULT_SCHEDULER_INTERVAL,
+        # Use the imported constant for initial_validation_threads
+        initial_validation_threads=DEFAULT_VALIDATION_THREADS_FROM_VALIDATOR,
+    )
 
 # --- Flask App Setup ---
 app = Flask(__name__)
@@ -79,11 +103,15 @@ CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://localh
 # --- Lifecycle / Cleanup ---
 def on_startup():
     print("Flask application starting up...")
+    if IS_API_WORKER:
+        print(f"API worker serving pool snapshot {scheduler.snapshot.path}; scheduler runs in the serving process.")
+        return
     print(f"Scheduler initial threads: {scheduler.validation_threads}, interval: {scheduler.interval_seconds}s")
     print("Scheduler is NOT auto-started. Use POST /scheduler/start to begin.")
 
 def on_shutdown():
     print("Flask application shutting down...")
+    if IS_API_WORKER: return # The serving process owns the scheduler lifecycle
     scheduler.stop()
     print("Proxy scheduler stopped.")
 
@@ -154,6 +182,31 @@ def set_scheduler_threads_endpoint():
     scheduler.set_validation_threads(payload.validation_threads)
     return jsonify({"message": f"Validation threads set to {payload.validation_threads}.", "status": scheduler.get_status()})
 
+@app.route("/scheduler/cancel", methods=["POST"])
+def cancel_scheduler_run_endpoint():
+    """Cancel the running validation, keeping results completed so far"""
+    result_message = scheduler.cancel_validation()
+    return jsonify({"message": result_message, "status": scheduler.get_status()})
+
+@app.route("/scheduler/deadline", methods=["POST"])
+def set_scheduler_deadline_endpoint():
+    """Set (or clear) the maximum duration of a validation run"""
+    payload = validate_body(SetDeadlineRequest, request.get_json())
+    if isinstance(payload, Response): return payload # Return error if validation failed
+
+    scheduler.set_sweep_deadline(payload.deadline_seconds)
+    message = f"Sweep deadline set to {payload.deadline_seconds}s." if payload.deadline_seconds else "Sweep deadline cleared."
+    return jsonify({"message": message, "status": scheduler.get_status()})
+
+@app.route("/scheduler/tracing", methods=["POST"])
+def set_scheduler_tracing_endpoint():
+    """Enable or disable per-phase probe timing for upcoming runs"""
+    payload = validate_body(SetTracingRequest, request.get_json())
+    if isinstance(payload, Response): return payload # Return error if validation failed
+
+    scheduler.set_trace_collection(payload.enabled)
+    return jsonify({"message": f"Probe tracing {'enabled' if payload.enabled else 'disabled'}.", "status": scheduler.get_status()})
+
 @app.route("/scheduler/status", methods=["GET"])
 def get_scheduler_status_endpoint():
     """Get current scheduler status"""
@@ -169,7 +222,16 @@ def get_scheduler_status_endpoint():
         last_run_time=current_status.get("last_run_time"),
         next_run_time=current_status.get("next_run_time"),
         current_proxy_count=current_status.get("current_proxy_count", 0),
-        valid_proxy_count=current_status.get("valid_proxy_count", 0)
+        valid_proxy_count=current_status.get("valid_proxy_count", 0),
+        snapshot_version=current_status.get("snapshot_version"),
+        snapshot_published_at=current_status.get("snapshot_published_at"),
+        sweep_deadline_seconds=current_status.get("sweep_deadline_seconds"),
+        last_run_stats=current_status.get("last_run_stats"),
+        collect_traces=current_status.get("collect_traces", False),
+        provider_cache=current_status.get("provider_cache"),
+        shard_processes=current_status.get("shard_processes", 0),
+        shard_workers_connected=current_status.get("shard_workers_connected", 0),
+        negative_cache=current_status.get("negative_cache"),
     )
     
     # Dump to dict for JSON serialization
@@ -182,6 +244,10 @@ def get_proxies_list_endpoint():
     only_valid_arg = request.args.get("only_valid", "true").lower()
     only_valid = only_valid_arg in ["true", "1", "yes", "on"]
 
+    if IS_API_WORKER:
+        # Serialized once per publish by the scheduler process; served as-is from the mapped snapshot
+        return Response(scheduler.get_proxies_body(only_valid=only_valid), mimetype="application/json")
+
     proxy_items = scheduler.get_proxies(only_valid=only_valid)
     
     # Convert to response models then to dicts
@@ -190,6 +256,17 @@ def get_proxies_list_endpoint():
     
     return jsonify(data)
 
+@app.route("/proxies/<proxy_id>/trace", methods=["GET"])
+def get_proxy_trace_endpoint(proxy_id: str):
+    """Get the per-phase timing of a proxy's last probe (id: protocol-ip-port)"""
+    proxy_item = next((p for p in scheduler.get_proxies(only_valid=False) if p.proxy_id() == proxy_id), None)
+    if proxy_item is None:
+        return jsonify({"detail": f"Proxy {proxy_id} not found."}), 404
+    trace = trace_as_dict(proxy_item.probe_trace)
+    if trace is None:
+        return jsonify({"detail": f"No trace recorded for {proxy_id}. Enable with POST /scheduler/tracing."}), 404
+    return jsonify({"id": proxy_id, **trace})
+
 # --- Main execution for Flask (for direct script run `python app/backend/main.py`) ---
 if __name__ == "__main__":
     print("Starting Flask server directly from main.py script...")
@@ -200,6 +277,6 @@ if __name__ == "__main__":
         print(f"Failed to instantiate ProxyItem in __main__: {e}.")
         sys.exit(1)
     
-    # Running without reloader to prevent duplicated scheduler initialization during dev
+    # Development server only. For multiple API workers use `python -m app.backend.serving`.
     # 'debug=True' enables the debugger. 
     app.run(host="0.0.0.0", port=8000, debug=True, use_reloader=True)
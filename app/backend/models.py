@@ -1,5 +1,5 @@
 # app/backend/models.py
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field
 
 class ProxyItem(BaseModel):
@@ -14,10 +14,16 @@ class ProxyItem(BaseModel):
     response_time: Optional[float] = Field(None, description="Response time of the proxy server in milliseconds.")
     last_checked: Optional[str] = Field(None, description="Timestamp of the last check for the proxy's availability.")
     is_valid: bool = Field(False, description="Indicates if the proxy is valid or not. Defaults to False.") # Changed default to False
+    verified_protocols: Optional[List[str]] = Field(None, description="Protocols confirmed by fingerprinting the endpoint, if it was fingerprinted.")
+    probe_trace: Optional[List[Optional[float]]] = Field(None, description="Per-phase timings (ms) of the last traced probe, ordered as probe_trace.TRACE_PHASES.")
 
     def proxy_string(self) -> str:
         return f"{self.protocol}://{self.ip}:{self.port}"
 
+    def proxy_id(self) -> str:
+        # Same identifier the frontend builds for table rows
+        return f"{self.protocol}-{self.ip}-{self.port}"
+
     # For de-duplication and dictionary keys
     def __hash__(self):
         return hash((self.ip, self.port, self.protocol))
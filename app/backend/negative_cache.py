@@ -0,0 +1,103 @@
+# app/backend/negative_cache.py
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, Tuple
+
+DEFAULT_NEGATIVE_CACHE_PATH = (os.environ.get("PROXY_NEGATIVE_CACHE_PATH")
+                               or os.path.join(tempfile.gettempdir(), "proxy_negative_cache.json"))
+DEFAULT_CAPACITY = 200_000 # Least recently failed keys are evicted past this
+BASE_BACKOFF_SECONDS = 1800 # Wait after the first failure; doubles with each further failure
+MAX_BACKOFF_SECONDS = 7 * 24 * 3600
+BACKOFF_JITTER = 0.25 # Delays are spread by +/- this fraction so dead proxies don't all return in the same sweep
+
+ProxyKey = Tuple[str, int, str] # (ip, port, protocol)
+
+
+class NegativeCache:
+    """
+    Remembers proxies that keep failing validation and holds them back with exponential
+    backoff, so each sweep does not pay a full timeout for every long-dead ip:port again.
+
+    Entries map (ip, port, protocol) to (consecutive failures, retry-at timestamp) in an
+    LRU-bounded dict, and are mirrored to a JSON file so the backoff survives restarts.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_NEGATIVE_CACHE_PATH, capacity: int = DEFAULT_CAPACITY,
+                 base_backoff_seconds: float = BASE_BACKOFF_SECONDS, max_backoff_seconds: float = MAX_BACKOFF_SECONDS,
+                 jitter: float = BACKOFF_JITTER):
+        self.path = path # None keeps the cache in memory only
+        self.capacity = capacity
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.jitter = jitter
+        self._entries: "OrderedDict[ProxyKey, Tuple[int, float]]" = OrderedDict()
+        self._stats: Dict[str, int] = {"skipped": 0, "failures_recorded": 0, "recovered": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def backoff_seconds(self, failures: int) -> float:
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** (failures - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def is_suppressed(self, key: ProxyKey, now: Optional[float] = None) -> bool:
+        """True while `key` is still backing off; counts the skip."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= (now if now is not None else time.time()): return False
+            self._stats["skipped"] += 1
+            return True
+
+    def record_failure(self, keys: Iterable[ProxyKey]):
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                failures = self._entries.pop(key, (0, 0.0))[0] + 1
+                self._entries[key] = (failures, now + self.backoff_seconds(failures))
+                self._stats["failures_recorded"] += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False); self._stats["evicted"] += 1
+
+    def record_success(self, keys: Iterable[ProxyKey]):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None: self._stats["recovered"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock: return dict(self._stats, entries=len(self._entries))
+
+    def _load(self):
+        if not self.path: return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            if not isinstance(rows, list): raise ValueError(f"expected a list of entries, got {type(rows).__name__}")
+        except FileNotFoundError: return
+        except (OSError, ValueError) as e:
+            print(f"[NEGATIVE_CACHE] Ignoring unreadable cache file {self.path}: {e}")
+            return
+        bad_rows = 0
+        for row in rows[-self.capacity:]:
+            try:
+                ip, port, protocol, failures, retry_at = row
+                self._entries[(str(ip), int(port), str(protocol))] = (int(failures), float(retry_at))
+            except (ValueError, TypeError): bad_rows += 1
+        if bad_rows: print(f"[NEGATIVE_CACHE] Ignoring {bad_rows} unreadable entries in cache file {self.path}")
+
+    def save(self):
+        if not self.path: return
+        with self._lock:
+            rows = [[ip, port, protocol, failures, round(retry_at, 1)]
+                    for (ip, port, protocol), (failures, retry_at) in self._entries.items()]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[NEGATIVE_CACHE] Could not persist {self.path}: {e}")
@@ -0,0 +1,175 @@
+# app/backend/pool_snapshot.py
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+
+from app.backend.models import ProxyItem
+
+# File layout: fixed header followed by three sections.
+#   magic (8s) | version (Q) | published_at epoch seconds (d) | meta length (Q) | valid body length (Q) | all body length (Q)
+#   meta: UTF-8 JSON object with pool counts, probe traces and any extra fields
+#   valid body / all body: the exact GET /proxies response bodies for only_valid=true / false
+SNAPSHOT_MAGIC = b"PXSNAP02"
+SNAPSHOT_HEADER = struct.Struct("<8sQdQQQ")
+SNAPSHOT_FILENAME = "proxy_pool.snapshot"
+SNAPSHOT_FILENAME_FOR_PORT = "proxy_pool.{port}.snapshot"
+# Fields of main.ProxyItemResponse, in order: what GET /proxies returns for each proxy
+RESPONSE_FIELDS = ("ip", "port", "protocol", "country", "anonymity", "source", "last_checked",
+                   "response_time", "is_valid", "verified_protocols")
+EMPTY_BODY = b"[]"
+
+def default_snapshot_path(port: Optional[int] = None) -> str:
+    """
+    Prefer the tmpfs-backed /dev/shm so the snapshot lives in shared memory. With the
+    serving `port` in the name, instances on one host each get their own file.
+    """
+    shm_dir = "/dev/shm"
+    base_dir = shm_dir if os.path.isdir(shm_dir) and os.access(shm_dir, os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base_dir, SNAPSHOT_FILENAME if port is None else SNAPSHOT_FILENAME_FOR_PORT.format(port=port))
+
+def _response_row(item: ProxyItem) -> Dict[str, Any]:
+    return {field: getattr(item, field) for field in RESPONSE_FIELDS}
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class PoolSnapshotWriter:
+    """
+    Publishes the scheduler's proxy pool to a snapshot file, with the /proxies response
+    bodies serialized once per publish instead of once per request.
+    Each publish writes a new file and atomically renames it over the old one,
+    so a reader never sees a half-written snapshot.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or default_snapshot_path()
+        self._version: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def publish(self, proxies: List[ProxyItem], extra: Optional[Dict[str, Any]] = None) -> int:
+        rows = [_response_row(p) for p in proxies]
+        valid_body = _dumps([row for row in rows if row["is_valid"]])
+        all_body = _dumps(rows)
+        meta_dict: Dict[str, Any] = {
+            "proxy_count": len(rows),
+            "valid_proxy_count": sum(1 for row in rows if row["is_valid"]),
+            "traces": {p.proxy_id(): p.probe_trace for p in proxies if p.probe_trace}, # Not part of the bodies
+        }
+        if extra: meta_dict.update(extra)
+        meta = _dumps(meta_dict)
+
+        with self._lock:
+            self._version += 1
+            header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self._version, time.time(), len(meta), len(valid_body), len(all_body))
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(meta)
+                f.write(valid_body)
+                f.write(all_body)
+            os.replace(tmp_path, self.path)
+            return self._version
+
+
+class PoolSnapshotReader:
+    """
+    Reads the snapshot file published by PoolSnapshotWriter. The current version is kept
+    memory-mapped: get_proxies_body() slices the pre-serialized /proxies body straight out
+    of the mapping, so serving the pool decodes nothing. Only the small meta section is
+    parsed when a new version appears; get_proxies() decodes ProxyItems lazily, once per
+    version. Between versions each read costs a single stat() call.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or default_snapshot_path()
+        self._file_ident: Optional[Tuple[int, int, int]] = None
+        self._version: int = 0
+        self._published_at: Optional[float] = None
+        self._mapped: Optional[mmap.mmap] = None
+        self._valid_body: Tuple[int, int] = (0, 0) # (start, end) offsets in the mapping
+        self._all_body: Tuple[int, int] = (0, 0)
+        self._meta: Dict[str, Any] = {}
+        self._proxies: Optional[List[ProxyItem]] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def _refresh(self):
+        try: st = os.stat(self.path)
+        except FileNotFoundError: return
+        file_ident = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if file_ident == self._file_ident or st.st_size < SNAPSHOT_HEADER.size: return
+
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, published_at, meta_length, valid_length, all_length = SNAPSHOT_HEADER.unpack_from(mapped)
+            if magic != SNAPSHOT_MAGIC:
+                print(f"[SNAPSHOT_WARNING] {self.path} is not a pool snapshot, ignoring.")
+                return
+            meta_start = SNAPSHOT_HEADER.size
+            valid_start = meta_start + meta_length
+            all_start = valid_start + valid_length
+            if all_start + all_length > len(mapped): raise ValueError("snapshot is truncated")
+            meta = json.loads(mapped[meta_start:valid_start])
+            # Slices are copies, so dropping the previous mapping closes it
+            self._mapped = mapped
+            self._valid_body = (valid_start, all_start)
+            self._all_body = (all_start, all_start + all_length)
+            self._meta = meta
+            self._proxies = None
+            self._version = version
+            self._published_at = published_at
+            self._file_ident = file_ident
+        except (OSError, struct.error, ValueError) as e:
+            print(f"[SNAPSHOT_WARNING] Could not read snapshot {self.path}: {e}")
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def get_proxies_body(self, only_valid: bool = True) -> bytes:
+        """The GET /proxies response body, as published."""
+        with self._lock:
+            self._refresh()
+            if self._mapped is None: return EMPTY_BODY
+            start, end = self._valid_body if only_valid else self._all_body
+            return self._mapped[start:end]
+
+    def get_proxies(self, only_valid: bool = True) -> List[ProxyItem]:
+        with self._lock:
+            self._refresh()
+            if self._proxies is None:
+                start, end = self._all_body
+                rows = json.loads(self._mapped[start:end]) if self._mapped is not None else []
+                traces = self._meta.get("traces", {})
+                self._proxies = [ProxyItem(**row) for row in rows]
+                for p in self._proxies: p.probe_trace = traces.get(p.proxy_id())
+            if only_valid: return [p for p in self._proxies if p.is_valid]
+            return list(self._proxies)
+
+    def get_payload_field(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._refresh()
+            return self._meta.get(key, default)
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "snapshot_version": self._version,
+                "snapshot_published_at": datetime.fromtimestamp(self._published_at).isoformat() if self._published_at else None,
+                "current_proxy_count": self._meta.get("proxy_count", 0),
+                "valid_proxy_count": self._meta.get("valid_proxy_count", 0),
+            }
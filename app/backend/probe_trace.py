@@ -0,0 +1,260 @@
+# app/backend/probe_trace.py
+import itertools
+import socket
+import ssl
+import struct
+import time
+from typing import List, Optional, Dict, Any, Tuple, Iterable
+from urllib.parse import urlsplit, urljoin
+
+import requests
+
+from app.backend.models import ProxyItem
+
+# Order of the values stored in ProxyItem.probe_trace (milliseconds).
+# 0.0 = phase not needed for this probe (e.g. dns for HTTP proxies, which resolve the target
+# themselves), None = phase never reached (probe failed earlier).
+TRACE_PHASES = ("dns", "connect", "tunnel", "tls", "ttfb", "total")
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+MAX_REDIRECTS = 30 # requests' default
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class ProbeError(OSError):
+    """A traced probe failed; `phase` names the step that failed."""
+
+    def __init__(self, phase: str, message: str):
+        super().__init__(f"{phase}: {message}")
+        self.phase = phase
+
+
+class ProbeTrace:
+    """Per-phase timings for one probe through a proxy."""
+
+    __slots__ = ("_started", "_phase_started", "timings")
+
+    def __init__(self):
+        self.timings: Dict[str, Optional[float]] = {phase: None for phase in TRACE_PHASES}
+        self._started = time.perf_counter()
+        self._phase_started = self._started
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.timings[phase] = round((now - self._phase_started) * 1000, 2)
+        self._phase_started = now
+
+    def skip(self, phase: str):
+        self.timings[phase] = 0.0
+
+    def start_hop(self):
+        """Following a redirect: per-phase timings restart, the total keeps running."""
+        self.timings = {phase: None for phase in TRACE_PHASES}
+        self._phase_started = time.perf_counter()
+
+    def finish(self):
+        self.timings["total"] = round((time.perf_counter() - self._started) * 1000, 2)
+
+    def to_list(self) -> List[Optional[float]]:
+        return [self.timings[phase] for phase in TRACE_PHASES]
+
+
+def trace_as_dict(probe_trace: Optional[List[Optional[float]]]) -> Optional[Dict[str, Any]]:
+    if not probe_trace: return None
+    phases = dict(zip(TRACE_PHASES, probe_trace))
+    failed_phase = next((phase for phase, value in phases.items() if value is None), None)
+    return {"phases_ms": phases, "failed_phase": failed_phase}
+
+
+def _recv_until(sock: socket.socket, marker: bytes, phase: str) -> bytes:
+    data = b""
+    while marker not in data:
+        chunk = sock.recv(4096)
+        if not chunk: raise ProbeError(phase, "connection closed by proxy")
+        data += chunk
+        if len(data) > MAX_RESPONSE_BYTES: raise ProbeError(phase, "response too large")
+    return data
+
+def _recv_exact(sock: socket.socket, size: int, phase: str) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk: raise ProbeError(phase, "connection closed by proxy")
+        data += chunk
+    return data
+
+def _open_tunnel(sock: socket.socket, protocol: str, host: str, port: int, target_ip: Optional[str]):
+    if protocol == "socks5":
+        sock.sendall(b"\x05\x01\x00")
+        greeting = _recv_exact(sock, 2, "tunnel")
+        if greeting != b"\x05\x00": raise ProbeError("tunnel", "SOCKS5 server requires authentication")
+        # Target already resolved locally, as requests does for socks5:// proxies
+        sock.sendall(b"\x05\x01\x00\x01" + socket.inet_aton(target_ip) + struct.pack(">H", port))
+        reply = _recv_exact(sock, 4, "tunnel")
+        if reply[1] != 0x00: raise ProbeError("tunnel", f"SOCKS5 connect failed (code {reply[1]})")
+        address_length = {0x01: 4, 0x04: 16}.get(reply[3])
+        if address_length is None: address_length = _recv_exact(sock, 1, "tunnel")[0]
+        _recv_exact(sock, address_length + 2, "tunnel")
+    elif protocol == "socks4":
+        sock.sendall(struct.pack(">BBH4s", 4, 1, port, socket.inet_aton(target_ip)) + b"\x00")
+        reply = _recv_exact(sock, 8, "tunnel")
+        if reply[1] != 0x5A: raise ProbeError("tunnel", f"SOCKS4 connect rejected (code {reply[1]})")
+    else: # HTTP proxy with CONNECT
+        target = f"{host}:{port}"
+        sock.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode("ascii"))
+        status_line = _recv_until(sock, b"\r\n\r\n", "tunnel").split(b"\r\n", 1)[0]
+        parts = status_line.split(b" ", 2)
+        if len(parts) < 2 or not parts[1].startswith(b"2"): raise ProbeError("tunnel", f"CONNECT refused: {status_line[:80]!r}")
+
+def _decode_chunked(body: bytes) -> bytes:
+    decoded = b""
+    while True:
+        size_line, separator, body = body.partition(b"\r\n")
+        if not separator: raise ProbeError("total", "chunked body ended early")
+        try: size = int(size_line.split(b";")[0].strip(), 16)
+        except ValueError: raise ProbeError("total", f"malformed chunk size {size_line[:20]!r}")
+        if size == 0: return decoded
+        if len(body) < size + 2: raise ProbeError("total", "chunked body ended early")
+        decoded += body[:size]
+        body = body[size + 2:]
+
+def _verified_tls_context() -> ssl.SSLContext:
+    # Same CA bundle requests verifies against
+    return ssl.create_default_context(cafile=requests.certs.where())
+
+def _traced_hop(trace: ProbeTrace, proxy_item: ProxyItem, url: str, timeout: float,
+                headers: Dict[str, str]) -> Tuple[int, List[bytes], bytes]:
+    split = urlsplit(url)
+    is_tls = split.scheme == "https"
+    host = split.hostname or ""
+    port = split.port or (443 if is_tls else 80)
+    path = (split.path or "/") + (f"?{split.query}" if split.query else "")
+    protocol = proxy_item.protocol.lower()
+
+    target_ip: Optional[str] = None
+    if protocol in ("socks4", "socks5"):
+        try: target_ip = socket.gethostbyname(host)
+        except (socket.gaierror, UnicodeError) as e: raise ProbeError("dns", str(e))
+        trace.mark("dns")
+    else: trace.skip("dns") # HTTP proxies resolve the target themselves
+
+    sock: Optional[socket.socket] = None
+    try:
+        try:
+            sock = socket.create_connection((proxy_item.ip, proxy_item.port), timeout=timeout)
+            if protocol == "https": # urllib3 speaks TLS to https:// proxies
+                sock = _verified_tls_context().wrap_socket(sock, server_hostname=proxy_item.ip)
+        except (OSError, ssl.SSLError) as e: raise ProbeError("connect", str(e))
+        trace.mark("connect")
+
+        tunnelled = protocol in ("socks4", "socks5") or is_tls
+        if tunnelled:
+            try: _open_tunnel(sock, protocol, host, port, target_ip)
+            except ProbeError: raise
+            except OSError as e: raise ProbeError("tunnel", str(e))
+            trace.mark("tunnel")
+        else: trace.skip("tunnel")
+
+        if is_tls:
+            try: sock = _verified_tls_context().wrap_socket(sock, server_hostname=host)
+            except (OSError, ssl.SSLError) as e: raise ProbeError("tls", str(e))
+            trace.mark("tls")
+        else: trace.skip("tls")
+
+        request_target = path if tunnelled else url # Plain HTTP proxies expect an absolute URI
+        request_lines = [f"GET {request_target} HTTP/1.1", f"Host: {host}", "Connection: close", "Accept: */*",
+                         "Accept-Encoding: identity"]
+        request_lines += [f"{name}: {value}" for name, value in headers.items()]
+        try:
+            sock.sendall(("\r\n".join(request_lines) + "\r\n\r\n").encode("ascii"))
+            first_chunk = sock.recv(4096)
+            if not first_chunk: raise ProbeError("ttfb", "connection closed before response")
+        except ProbeError: raise
+        except OSError as e: raise ProbeError("ttfb", str(e))
+        trace.mark("ttfb")
+
+        # Like requests' read timeout, `timeout` applies to each read rather than the whole body
+        response = first_chunk
+        try:
+            while True:
+                chunk = sock.recv(16384)
+                if not chunk: break
+                response += chunk
+                if len(response) > MAX_RESPONSE_BYTES: raise ProbeError("total", "response too large")
+        except ProbeError: raise
+        except OSError as e: raise ProbeError("total", f"body read failed: {e}")
+    finally:
+        if sock is not None:
+            try: sock.close()
+            except OSError: pass
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    head_lines = head.split(b"\r\n")
+    try: status = int(head_lines[0].split(b" ", 2)[1])
+    except (IndexError, ValueError): raise ProbeError("ttfb", f"malformed status line {head_lines[0][:80]!r}")
+    header_values = {}
+    for line in head_lines[1:]:
+        name, _, value = line.partition(b":")
+        header_values[name.strip().lower()] = value.strip()
+    if b"chunked" in header_values.get(b"transfer-encoding", b"").lower():
+        body = _decode_chunked(body)
+    elif b"content-length" in header_values:
+        try: expected_length = int(header_values[b"content-length"])
+        except ValueError: raise ProbeError("ttfb", "malformed Content-Length")
+        if len(body) < expected_length: raise ProbeError("total", f"body truncated ({len(body)} of {expected_length} bytes)")
+        body = body[:expected_length]
+    return status, head_lines, body
+
+def traced_get(proxy_item: ProxyItem, url: str, timeout: float, headers: Dict[str, str]) -> Tuple[int, bytes, ProbeTrace]:
+    """
+    Fetches `url` through the proxy with a minimal HTTP/1.1 client, timing each phase.
+    It reproduces what test_single_proxy's requests.get call does so that tracing does
+    not change which proxies pass: socks4/socks5 targets are resolved locally (the only
+    case with a 'dns' phase), https:// proxies are reached over TLS, https targets are
+    tunnelled with CONNECT and verified against requests' CA bundle, `timeout` applies
+    per socket operation, truncated bodies fail and redirects are followed (up to
+    MAX_REDIRECTS). After a redirect the phases describe the last hop; 'total' spans all.
+    Raises ProbeError on failure; the trace recorded so far is attached as `.trace`.
+    """
+    trace = ProbeTrace()
+    try:
+        for redirects_followed in itertools.count():
+            status, head_lines, body = _traced_hop(trace, proxy_item, url, timeout, headers)
+            location = next((line.split(b":", 1)[1].strip() for line in head_lines[1:]
+                             if line.lower().startswith(b"location:")), None)
+            if status not in REDIRECT_STATUSES or not location:
+                trace.finish()
+                return status, body, trace
+            if redirects_followed == MAX_REDIRECTS: raise ProbeError("total", f"exceeded {MAX_REDIRECTS} redirects")
+            url = urljoin(url, location.decode("latin-1"))
+            trace.start_hop()
+    except ProbeError as e:
+        # A failure while reading the body leaves "total" unset so it shows as the failed phase
+        if trace.timings["total"] is None and e.phase != "total": trace.finish()
+        e.trace = trace
+        raise
+
+
+def summarize_traces(proxies: Iterable[ProxyItem]) -> Dict[str, Any]:
+    """Aggregate per-phase statistics over every traced proxy of a run."""
+    samples: Dict[str, List[float]] = {phase: [] for phase in TRACE_PHASES}
+    failed_phase_counts: Dict[str, int] = {}
+    traced = 0
+    for item in proxies:
+        if not item.probe_trace: continue
+        traced += 1
+        for phase, value in zip(TRACE_PHASES, item.probe_trace):
+            if value: samples[phase].append(value) # Skips both skipped (0.0) and unreached (None)
+        failed_phase = trace_as_dict(item.probe_trace)["failed_phase"]
+        if failed_phase: failed_phase_counts[failed_phase] = failed_phase_counts.get(failed_phase, 0) + 1
+
+    phases: Dict[str, Any] = {}
+    for phase, values in samples.items():
+        if not values: continue
+        values.sort()
+        phases[phase] = {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": values[len(values) // 2],
+            "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))],
+        }
+    return {"traced": traced, "phases": phases, "failed_phase_counts": failed_phase_counts}
@@ -0,0 +1,115 @@
+# app/backend/protocol_probe.py
+import socket
+import struct
+from typing import Optional, Set, Iterable
+
+PROTOCOL_PROBE_TIMEOUT = 6
+PROBE_READ_BYTES = 512
+
+# Target used for the CONNECT / SOCKS4 requests; only the proxy's reply is inspected
+PROBE_CONNECT_HOST = "ipinfo.io"
+PROBE_CONNECT_PORT = 443
+PROBE_SOCKS4_TARGET_IP = "1.1.1.1"
+PROBE_SOCKS4_TARGET_PORT = 80
+
+SOCKS5_GREETING = b"\x05\x01\x00" # Version 5, one auth method offered: "no authentication"
+SOCKS5_NO_AUTH = 0x00
+SOCKS4_GRANTED = 0x5A
+SOCKS4_REPLY_CODES = (0x5A, 0x5B, 0x5C, 0x5D)
+
+# Preference when several protocols are verified for one endpoint. An HTTP proxy that
+# accepts CONNECT is validated as "http": requests tunnels https test URLs through it.
+PROTOCOL_PREFERENCE = ("socks5", "http", "https", "socks4")
+SOCKS_PROTOCOLS = ("socks4", "socks5")
+
+def _http_connect_request() -> bytes:
+    target = f"{PROBE_CONNECT_HOST}:{PROBE_CONNECT_PORT}"
+    return f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\nProxy-Connection: keep-alive\r\n\r\n".encode("ascii")
+
+def _socks4_connect_request() -> bytes:
+    return struct.pack(">BBH4s", 4, 1, PROBE_SOCKS4_TARGET_PORT, socket.inet_aton(PROBE_SOCKS4_TARGET_IP)) + b"\x00"
+
+def _exchange(ip: str, port: int, payload: bytes, timeout: float) -> bytes:
+    """
+    Sends one greeting on a fresh connection and returns the server's first reply. A server that
+    closes, resets or stays silent (e.g. waiting for a request of its own protocol) gives b"".
+    Connection failures raise OSError.
+    """
+    with socket.create_connection((ip, port), timeout=timeout) as sock:
+        try:
+            sock.sendall(payload)
+            return sock.recv(PROBE_READ_BYTES)
+        except (socket.timeout, ConnectionResetError, BrokenPipeError): return b""
+
+def classify_reply(reply: bytes) -> Optional[str]:
+    """Names the protocol family that produced `reply`: 'http', 'socks5', 'socks4' or None."""
+    if reply.startswith(b"HTTP/"): return "http"
+    if len(reply) >= 2 and reply[0] == 0x05: return "socks5"
+    if len(reply) >= 2 and reply[0] == 0x00 and reply[1] in SOCKS4_REPLY_CODES: return "socks4"
+    return None
+
+def _http_status(reply: bytes) -> Optional[int]:
+    try: return int(reply.split(b" ", 2)[1])
+    except (IndexError, ValueError): return None
+
+def _protocols_from_connect_reply(reply: bytes) -> Set[str]:
+    status = _http_status(reply)
+    if status is None or status == 407: return set() # 407: needs credentials we do not have
+    if 200 <= status < 300: return {"http", "https"}
+    return {"http"} # Speaks HTTP but refuses CONNECT; may still relay absolute-URI requests
+
+
+def fingerprint_protocols(ip: str, port: int, timeout: float = PROTOCOL_PROBE_TIMEOUT,
+                          labelled_protocols: Iterable[str] = ()) -> Set[str]:
+    """
+    Determines which proxy protocols ip:port actually speaks, returning a subset of
+    {'http', 'https', 'socks4', 'socks5'} (empty if unreachable or unusable).
+
+    Greetings are tried in an order chosen from the provider labels until one gets a reply
+    that identifies the protocol family: the SOCKS4 request first for socks4-labelled
+    endpoints (strict SOCKS4 servers wait for a full request and never answer the others),
+    then the SOCKS5 greeting for socks-labelled ones, HTTP CONNECT otherwise. A greeting met
+    with silence, a reset or a hang-up moves on to the next one. A further connection is
+    only opened to confirm a family detected from a mismatched greeting, or to check SOCKS4
+    on a SOCKS5 server labelled as both.
+    """
+    labels = {p.lower() for p in labelled_protocols}
+    if "socks4" in labels:
+        greetings = [_socks4_connect_request(), SOCKS5_GREETING, _http_connect_request()]
+    elif "socks5" in labels:
+        greetings = [SOCKS5_GREETING, _http_connect_request()]
+    else:
+        greetings = [_http_connect_request(), SOCKS5_GREETING]
+
+    try:
+        reply, family = b"", None
+        for first_payload in greetings:
+            reply = _exchange(ip, port, first_payload, timeout)
+            family = classify_reply(reply)
+            if family is not None: break
+
+        verified: Set[str] = set()
+        if family == "http":
+            if first_payload != _http_connect_request():
+                reply = _exchange(ip, port, _http_connect_request(), timeout)
+            verified |= _protocols_from_connect_reply(reply)
+        elif family == "socks5":
+            if first_payload != SOCKS5_GREETING:
+                reply = _exchange(ip, port, SOCKS5_GREETING, timeout)
+            if len(reply) >= 2 and reply[0] == 0x05 and reply[1] == SOCKS5_NO_AUTH: verified.add("socks5")
+            if "socks4" in labels and first_payload != _socks4_connect_request(): # Not already refused above
+                socks4_reply = _exchange(ip, port, _socks4_connect_request(), timeout)
+                if len(socks4_reply) >= 2 and socks4_reply[1] == SOCKS4_GRANTED: verified.add("socks4")
+        elif family == "socks4":
+            if first_payload != _socks4_connect_request():
+                reply = _exchange(ip, port, _socks4_connect_request(), timeout)
+            if len(reply) >= 2 and reply[1] == SOCKS4_GRANTED: verified.add("socks4")
+        return verified
+    except OSError: # Refused, unreachable or connect timed out
+        return set()
+
+def preferred_protocol(verified: Iterable[str]) -> Optional[str]:
+    verified_set = set(verified)
+    for protocol in PROTOCOL_PREFERENCE:
+        if protocol in verified_set: return protocol
+    return None
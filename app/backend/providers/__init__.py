@@ -1,5 +1,6 @@
 from typing import List
 from .base import ProxyProviderBase # ProxyItem is no longer imported from base
+from .cache import ProviderCache, CacheEntry
 from app.backend.models import ProxyItem # Import ProxyItem from models
 from .freeproxylist import FreeProxyListNetProvider
 from .geonode import GeoNodeProvider
@@ -8,18 +9,24 @@ from .proxyscrape import ProxyScrapeProvider
 __all__ = [
     "ProxyItem",
     "ProxyProviderBase",
+    "ProviderCache",
+    "CacheEntry",
+    "PROVIDER_CACHE",
     "FreeProxyListNetProvider",
     "GeoNodeProvider",
     "ProxyScrapeProvider",
 ]
 
+# Shared by every get_all_proxies() call so repeated sweeps/refreshes reuse provider responses
+PROVIDER_CACHE = ProviderCache()
+
 def get_all_proxies() -> List[ProxyItem]:
     """Fetches proxies from all available providers and returns a single list."""
     all_proxies: List[ProxyItem] = []
     providers = [
-        FreeProxyListNetProvider(),
-        GeoNodeProvider(),
-        ProxyScrapeProvider(),
+        FreeProxyListNetProvider(cache=PROVIDER_CACHE),
+        GeoNodeProvider(cache=PROVIDER_CACHE),
+        ProxyScrapeProvider(cache=PROVIDER_CACHE),
     ]
 
     for provider in providers:
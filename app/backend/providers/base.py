@@ -1,7 +1,10 @@
 import json
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Callable
+import requests
 from app.backend.models import ProxyItem 
+from .cache import ProviderCache, CacheEntry
 
 
 class ProxyProviderBase(ABC):
@@ -9,6 +12,12 @@ class ProxyProviderBase(ABC):
     Abstract base class for proxy providers.
     Subclasses must implement the `fetch_proxies` method.
     """
+    # How long a cached response is reused without contacting the source at all
+    CACHE_TTL_SECONDS: int = 300
+
+    def __init__(self, cache: Optional[ProviderCache] = None, cache_ttl_seconds: Optional[int] = None):
+        self.cache = cache
+        if cache_ttl_seconds is not None: self.CACHE_TTL_SECONDS = cache_ttl_seconds
 
     @abstractmethod
     def fetch_proxies(self) -> List[ProxyItem]:
@@ -20,6 +29,42 @@ class ProxyProviderBase(ABC):
             List[ProxyItem]: A list of ProxyItem objects.
         """
 
+    def fetch_url_cached(self, url: str, timeout: int, parse: Callable[[str], List[ProxyItem]]) -> List[ProxyItem]:
+        """
+        Downloads `url` and parses it with `parse`, going through the provider cache if one is set.
+        Fresh entries (younger than CACHE_TTL_SECONDS) are served without a request; stale ones are
+        revalidated with If-None-Match/If-Modified-Since so an unchanged source costs a 304 and no re-parse.
+        Request and parse errors propagate to the caller.
+        """
+        if self.cache is None:
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            return parse(response.text)
+
+        entry = self.cache.get(url)
+        if entry is not None and entry.age_seconds() < self.CACHE_TTL_SECONDS:
+            self.cache.record("hits")
+            return [ProxyItem(**item) for item in entry.items]
+
+        response = requests.get(url, timeout=timeout, headers=entry.conditional_headers() if entry else None)
+        if response.status_code == 304 and entry is not None:
+            self.cache.record("not_modified")
+            entry.fetched_at = time.time() # Restart the TTL
+            self.cache.store(entry)
+            return [ProxyItem(**item) for item in entry.items]
+
+        response.raise_for_status()
+        proxies = parse(response.text)
+        self.cache.record("misses")
+        self.cache.store(CacheEntry(
+            url=url,
+            body=response.text,
+            items=[proxy.model_dump() for proxy in proxies],
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        ))
+        return proxies
+
     def get_proxies_json(self) -> str:
         """
         Fetches proxies and returns them as a JSON string.
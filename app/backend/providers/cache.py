@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional, Dict, Any
+
+DEFAULT_CACHE_DIR = os.environ.get("PROXY_PROVIDER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "proxy_provider_cache")
+
+
+class CacheEntry:
+    """One cached provider response: raw body, parsed items and validators for conditional GETs."""
+
+    __slots__ = ("url", "body", "items", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, url: str, body: str, items: List[Dict[str, Any]], etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, fetched_at: Optional[float] = None):
+        self.url = url
+        self.body = body
+        self.items = items
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    def age_seconds(self) -> float:
+        return time.time() - self.fetched_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag: headers["If-None-Match"] = self.etag
+        if self.last_modified: headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class ProviderCache:
+    """
+    URL-keyed cache of provider responses, kept in memory and mirrored to disk so a
+    restarted process does not have to re-download every source.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir # None keeps the cache in memory only
+        self._entries: Dict[str, CacheEntry] = {}
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+
+    def _path_for(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None or not self.cache_dir: return entry
+            try:
+                with open(self._path_for(url), "r", encoding="utf-8") as f:
+                    entry = CacheEntry(**json.load(f))
+            except FileNotFoundError: return None
+            except (OSError, ValueError, TypeError) as e:
+                print(f"[PROVIDER_CACHE] Ignoring unreadable cache file for {url}: {e}")
+                return None
+            self._entries[url] = entry
+            return entry
+
+    def store(self, entry: CacheEntry):
+        with self._lock:
+            self._entries[entry.url] = entry
+            if not self.cache_dir: return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._path_for(entry.url)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry.to_dict(), f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[PROVIDER_CACHE] Could not persist cache entry for {entry.url}: {e}")
+
+    def record(self, outcome: str):
+        with self._lock: self._stats[outcome] = self._stats.get(outcome, 0) + 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock: return dict(self._stats, entries=len(self._entries))
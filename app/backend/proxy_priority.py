@@ -0,0 +1,102 @@
+# app/backend/proxy_priority.py
+import heapq
+import itertools
+import re
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple, Iterable
+
+from app.backend.models import ProxyItem
+
+# Tiers are compared before any latency estimate: known-good first, unknown next, known-bad last
+TIER_PREVIOUSLY_VALID = 0
+TIER_UNSEEN = 1
+TIER_PREVIOUSLY_INVALID = 2
+
+DEFAULT_LATENCY_ESTIMATE_MS = 6000.0 # Used when neither history nor provider report a latency
+DEFAULT_SOURCE_RELIABILITY = 0.5
+STALENESS_PENALTY_MS_PER_MINUTE = 20.0
+MAX_STALENESS_MINUTES = 180
+
+_RELATIVE_AGE_PATTERN = re.compile(r"(\d+)\s*(sec|second|min|minute|hour|hr|day)s?\s+ago", re.IGNORECASE)
+_RELATIVE_AGE_UNITS = {"sec": 1, "second": 1, "min": 60, "minute": 60, "hour": 3600, "hr": 3600, "day": 86400}
+
+def last_checked_age_seconds(last_checked: Optional[str]) -> Optional[float]:
+    """Age of a provider 'last checked' value: ISO timestamps (GeoNode) or '5 mins ago' (free-proxy-list.net)."""
+    if not last_checked: return None
+    match = _RELATIVE_AGE_PATTERN.search(last_checked)
+    if match: return float(int(match.group(1)) * _RELATIVE_AGE_UNITS[match.group(2).lower()])
+    try:
+        checked_at = datetime.fromisoformat(last_checked.strip().replace("Z", "+00:00"))
+        # Our own timestamps are naive local time; providers may send offset-aware UTC
+        if checked_at.tzinfo is not None: checked_at = checked_at.astimezone().replace(tzinfo=None)
+        return max(0.0, (datetime.now() - checked_at).total_seconds())
+    except (ValueError, TypeError, OverflowError): return None
+
+
+class PriorityHistory:
+    """Outcome of the previous validation run, indexed for scoring the next one."""
+
+    def __init__(self, previous_results: Optional[Iterable[ProxyItem]] = None):
+        self._by_key: Dict[Tuple[str, int, str], ProxyItem] = {}
+        self._by_endpoint: Dict[Tuple[str, int], ProxyItem] = {}
+        source_totals: Dict[str, List[int]] = {}
+        for item in previous_results or []:
+            self._by_key[(item.ip, item.port, item.protocol)] = item
+            endpoint_best = self._by_endpoint.get((item.ip, item.port))
+            if endpoint_best is None or (item.is_valid and not endpoint_best.is_valid):
+                self._by_endpoint[(item.ip, item.port)] = item
+            counts = source_totals.setdefault(item.source, [0, 0])
+            counts[0] += 1 if item.is_valid else 0; counts[1] += 1
+        self.source_reliability: Dict[str, float] = {src: valid / total for src, (valid, total) in source_totals.items() if total}
+
+    def lookup(self, item: ProxyItem) -> Optional[ProxyItem]:
+        return self._by_key.get((item.ip, item.port, item.protocol)) or self._by_endpoint.get((item.ip, item.port))
+
+
+def score_proxy(item: ProxyItem, history: PriorityHistory) -> Tuple[int, float]:
+    """Lower sorts first. Returns (tier, estimated cost in ms)."""
+    previous = history.lookup(item)
+    if previous is not None and previous.is_valid:
+        tier = TIER_PREVIOUSLY_VALID
+        latency = previous.response_time or item.response_time or DEFAULT_LATENCY_ESTIMATE_MS
+    else:
+        tier = TIER_UNSEEN if previous is None else TIER_PREVIOUSLY_INVALID
+        latency = item.response_time or DEFAULT_LATENCY_ESTIMATE_MS
+
+    age = last_checked_age_seconds(item.last_checked)
+    staleness_minutes = MAX_STALENESS_MINUTES if age is None else min(age / 60, MAX_STALENESS_MINUTES)
+    reliability = history.source_reliability.get(item.source, DEFAULT_SOURCE_RELIABILITY)
+    # An unreliable source makes every latency estimate look up to twice as expensive
+    estimate = latency * (2.0 - reliability) + staleness_minutes * STALENESS_PENALTY_MS_PER_MINUTE
+    return tier, round(estimate, 2)
+
+
+class ProxyPriorityQueue:
+    """
+    Min-heap of candidates ordered by score_proxy. Candidates are pulled lazily from
+    `source` so that at most `capacity` of them are held (None holds everything,
+    giving a global ordering).
+    """
+
+    def __init__(self, source: Iterable[ProxyItem], history: Optional[PriorityHistory] = None, capacity: Optional[int] = None):
+        self.history = history or PriorityHistory()
+        self.capacity = capacity
+        self._source = iter(source)
+        self._source_exhausted = False
+        self._heap: List[Tuple[int, float, int, ProxyItem]] = []
+        self._counter = itertools.count() # Tie-breaker keeps heap entries comparable
+
+    def _fill(self):
+        while not self._source_exhausted and (self.capacity is None or len(self._heap) < self.capacity):
+            try: item = next(self._source)
+            except StopIteration: self._source_exhausted = True; break
+            tier, estimate = score_proxy(item, self.history)
+            heapq.heappush(self._heap, (tier, estimate, next(self._counter), item))
+
+    def pop(self) -> Optional[ProxyItem]:
+        self._fill()
+        if not self._heap: return None
+        return heapq.heappop(self._heap)[3]
+
+    def __len__(self) -> int:
+        return len(self._heap)
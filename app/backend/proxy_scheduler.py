@@ -2,10 +2,14 @@
 import threading
 import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 from app.backend.models import ProxyItem
 from app.backend.proxy_validator import validate_all_proxies, DEFAULT_TEST_URL, DEFAULT_THREADS as DEFAULT_VALIDATOR_THREADS
+from app.backend.pool_snapshot import PoolSnapshotWriter
+from app.backend.providers import PROVIDER_CACHE
+from app.backend.proxy_sharding import ShardCoordinator, authkey_from_environ
+from app.backend.negative_cache import NegativeCache
 
 DEFAULT_SCHEDULER_INTERVAL = 3600
 # Use the default from proxy_validator if not specified for ProxyScheduler
@@ -15,10 +19,36 @@ class ProxyScheduler:
     def __init__(self,
                  initial_interval_seconds: int = DEFAULT_SCHEDULER_INTERVAL,
                  initial_validation_threads: int = DEFAULT_PROXY_SCHEDULER_THREADS,
-                 test_url: str = DEFAULT_TEST_URL):
+                 test_url: str = DEFAULT_TEST_URL,
+                 snapshot_writer: Optional[PoolSnapshotWriter] = None,
+                 sweep_deadline_seconds: Optional[int] = None,
+                 fingerprint_protocols: bool = True,
+                 collect_traces: bool = False,
+                 shard_processes: int = 0,
+                 shard_listen_address: Optional[Tuple[str, int]] = None,
+                 shard_authkey: Optional[bytes] = None,
+                 negative_cache: Optional[NegativeCache] = None):
         self.interval_seconds: int = initial_interval_seconds
         self.validation_threads: int = initial_validation_threads
         self.test_url: str = test_url
+        # When set, every finished validation run is published for API worker processes
+        self.snapshot_writer: Optional[PoolSnapshotWriter] = snapshot_writer
+        # Upper bound on a single validation run; None means run to completion
+        self.sweep_deadline_seconds: Optional[int] = sweep_deadline_seconds
+        self._last_run_stats: Optional[Dict[str, Any]] = None
+        # Probe each ip:port once and detect its real protocols instead of trusting provider labels
+        self.fingerprint_protocols: bool = fingerprint_protocols
+        # Opt-in per-phase timing of every probe (see probe_trace.py)
+        self.collect_traces: bool = collect_traces
+        # Sharded validation (see proxy_sharding.py); 0 processes and no listen address = in-process.
+        # The coordinator lives as long as the scheduler so remote workers stay connected between sweeps;
+        # it refuses to start without a shared key (PROXY_SHARD_AUTHKEY).
+        self.shard_processes: int = shard_processes
+        self.shard_coordinator: Optional[ShardCoordinator] = None
+        if shard_listen_address is not None:
+            self.shard_coordinator = ShardCoordinator(shard_listen_address, shard_authkey or authkey_from_environ())
+        # Proxies that keep failing are skipped with exponential backoff (see negative_cache.py)
+        self.negative_cache: NegativeCache = negative_cache if negative_cache is not None else NegativeCache()
         self._current_proxies: List[ProxyItem] = []
         self._last_run_time: Optional[datetime] = None
         self._next_run_time: Optional[datetime] = None
@@ -28,6 +58,8 @@ class ProxyScheduler:
         self._stop_event: threading.Event = threading.Event()
         self._pause_event: threading.Event = threading.Event()
         self._refresh_event: threading.Event = threading.Event()
+        # Replaced for every run: probes abandoned by an earlier run keep watching their own event
+        self._cancel_event: threading.Event = threading.Event()
         self._lock: threading.Lock = threading.Lock()
         self._pause_event.set()
 
@@ -38,30 +70,68 @@ class ProxyScheduler:
             self._status = "validating"
             self._last_run_time = datetime.now()
             current_threads_for_run = self.validation_threads
+            deadline_for_run = self.sweep_deadline_seconds
+            previous_results = list(self._current_proxies)
+            collect_traces_for_run = self.collect_traces
+            fingerprint_for_run = self.fingerprint_protocols
+            cancel_event_for_run = self._cancel_event = threading.Event()
 
         print(f"[{datetime.now()}] SCHEDULER: Starting proxy validation with {current_threads_for_run} threads...")
+        run_stats: Dict[str, Any] = {}
         try:
             # validate_all_proxies now handles de-duplication of its input source (get_all_proxies)
             # and returns a list of updated ProxyItem objects.
             validated_proxies_list = validate_all_proxies(
                 proxy_list_input=None, # Let it call get_all_proxies internally
                 num_threads=current_threads_for_run,
-                test_url=self.test_url
+                test_url=self.test_url,
+                deadline_seconds=deadline_for_run,
+                cancel_event=cancel_event_for_run,
+                run_stats=run_stats,
+                history=previous_results, # Drives probe ordering: previously good proxies first
+                fingerprint=fingerprint_for_run,
+                collect_traces=collect_traces_for_run,
+                shard_processes=self.shard_processes,
+                shard_coordinator=self.shard_coordinator,
+                negative_cache=self.negative_cache,
             )
             # The list from validate_all_proxies should now have is_valid, response_time correctly set.
             
             with self._lock:
-                self._current_proxies = validated_proxies_list # Assign the processed list
+                if run_stats.get("stop_reason"):
+                    # Partial run: commit what was probed, keep the previous state of everything else
+                    merged = {p: p for p in self._current_proxies}
+                    if fingerprint_for_run:
+                        # A fingerprinted result replaces every row for its ip:port, whatever the old label
+                        probed_endpoints = {(p.ip, p.port) for p in validated_proxies_list}
+                        merged = {p: p for p in merged if (p.ip, p.port) not in probed_endpoints}
+                    for p in validated_proxies_list: merged.pop(p, None); merged[p] = p
+                    self._current_proxies = list(merged.values())
+                else:
+                    self._current_proxies = validated_proxies_list # Assign the processed list
                 valid_count = sum(1 for p in self._current_proxies if p.is_valid)
                 print(f"[{datetime.now()}] SCHEDULER: Validation finished. Stored {len(self._current_proxies)} proxies ({valid_count} valid).")
+            self.publish_snapshot()
         except Exception as e:
             print(f"[{datetime.now()}] SCHEDULER: Error during proxy validation: {e}")
         finally:
+            # Probes abandoned at a deadline are still running; stop them before their anonymity check
+            cancel_event_for_run.set()
             with self._lock:
+                self._last_run_stats = run_stats or None
                 self._validation_in_progress = False
                 self._status = "stopped" if self._stop_event.is_set() else ("paused" if self._pause_event.is_set() else "running")
 
 
+    def publish_snapshot(self):
+        if not self.snapshot_writer: return
+        with self._lock: proxies_to_publish = list(self._current_proxies)
+        try:
+            version = self.snapshot_writer.publish(proxies_to_publish)
+            print(f"[{datetime.now()}] SCHEDULER: Published pool snapshot v{version} ({len(proxies_to_publish)} proxies).")
+        except OSError as e:
+            print(f"[{datetime.now()}] SCHEDULER: Error publishing pool snapshot: {e}")
+
     def _scheduler_loop(self):
         print(f"[{datetime.now()}] Scheduler loop started.")
         if not self._stop_event.is_set():
@@ -101,10 +171,16 @@ class ProxyScheduler:
         with self._lock:
             if not (self._thread and self._thread.is_alive()): self._status = "stopped"; return
             print("Stopping scheduler..."); self._stop_event.set(); self._pause_event.set(); self._refresh_event.set()
+            self._cancel_event.set() # Ends a running sweep early, keeping completed results
         if self._thread: self._thread.join(timeout=max(5, self.interval_seconds // 10)); # Shorter timeout for join
         with self._lock: self._thread = None; self._status = "stopped"; self._next_run_time = None
         print("Scheduler stopped.")
 
+    def shutdown(self):
+        """Stops the scheduler for good, releasing the shard coordinator's socket."""
+        self.stop()
+        if self.shard_coordinator: self.shard_coordinator.close()
+
     def pause(self):
         with self._lock:
             if self._status not in ["running", "validating"]: return
@@ -124,6 +200,20 @@ class ProxyScheduler:
             return "Refresh task started in background."
         else: self._refresh_event.set(); return "Refresh signal sent."
 
+    def cancel_validation(self) -> str:
+        with self._lock:
+            if not self._validation_in_progress: return "No validation in progress."
+            self._cancel_event.set()
+        print("Cancelling current validation run...")
+        return "Validation cancel requested."
+
+    def set_sweep_deadline(self, seconds: Optional[int]):
+        if seconds is not None and seconds <= 0: return
+        with self._lock: self.sweep_deadline_seconds = seconds; print(f"Sweep deadline set to {seconds}s." if seconds else "Sweep deadline cleared.")
+
+    def set_trace_collection(self, enabled: bool):
+        with self._lock: self.collect_traces = bool(enabled); print(f"Probe tracing {'enabled' if enabled else 'disabled'}.")
+
     def set_interval(self, seconds: int):
         if seconds <= 0: return
         with self._lock: self.interval_seconds = seconds; print(f"Interval set to {seconds}s.")
@@ -145,6 +235,14 @@ class ProxyScheduler:
                 "next_run_time": self._next_run_time.isoformat() if self._next_run_time else None,
                 "current_proxy_count": len(self._current_proxies),
                 "valid_proxy_count": sum(1 for p in self._current_proxies if p.is_valid),
+                "snapshot_version": self.snapshot_writer.version if self.snapshot_writer else None,
+                "sweep_deadline_seconds": self.sweep_deadline_seconds,
+                "collect_traces": self.collect_traces,
+                "provider_cache": PROVIDER_CACHE.get_stats(),
+                "shard_processes": self.shard_processes,
+                "shard_workers_connected": self.shard_coordinator.connected_workers() if self.shard_coordinator else 0,
+                "negative_cache": self.negative_cache.get_stats(),
+                "last_run_stats": dict(self._last_run_stats) if self._last_run_stats else None,
             }
 
     def get_proxies(self, only_valid: bool = True) -> List[ProxyItem]:
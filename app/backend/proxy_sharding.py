@@ -0,0 +1,409 @@
+# app/backend/proxy_sharding.py
+"""
+Sharded validation across processes and nodes.
+
+A coordinator splits the deduplicated candidates into shards (by ip:port hash) and hands
+them out to shard workers connected over multiprocessing.connection (authenticated,
+pickle-based - only connect trusted workers). Each worker runs its own probe engine
+(proxy_validator.iter_validated_proxies) and streams result batches back; the coordinator
+merges them into one result stream. Local workers are spawned processes that connect to
+the coordinator exactly like remote ones started with:
+
+    python -m app.backend shard-worker --connect coordinator-host:7800
+
+(with the shared key in PROXY_SHARD_AUTHKEY, hex encoded). A ShardCoordinator outlives
+individual runs: remote workers stay connected between sweeps, and reconnect with
+backoff when the coordinator is not reachable.
+"""
+import multiprocessing
+import os
+import queue
+import random
+import socket
+import threading
+import time
+import zlib
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from typing import List, Optional, Dict, Set, Any, Iterator, Tuple
+
+from app.backend.models import ProxyItem
+
+SHARDS_PER_WORKER = 4 # More shards than workers balances uneven shards and lets late workers help
+RESULT_BATCH_SIZE = 64
+RESULT_FLUSH_INTERVAL = 0.25 # Seconds a partial batch may wait before being sent
+CANCEL_POLL_INTERVAL = 0.5
+MAX_SHARD_ATTEMPTS = 2
+IDLE_POLL_INTERVAL = 0.5 # Idle workers are checked this often for a new run or a dropped connection
+WORKER_JOIN_GRACE_SECONDS = 10 # A run relying on remote workers gives up after this long without any
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+RECONNECT_JITTER = 0.25
+AUTHKEY_ENV_VAR = "PROXY_SHARD_AUTHKEY"
+
+def _dump_item(item: ProxyItem) -> Dict[str, Any]:
+    return item.model_dump()
+
+def shard_index_for(item: ProxyItem, num_shards: int) -> int:
+    # Stable across processes and nodes, unlike hash()
+    return zlib.crc32(f"{item.ip}:{item.port}".encode("utf-8")) % num_shards
+
+def split_into_shards(candidates: List[ProxyItem], num_shards: int) -> List[List[ProxyItem]]:
+    shards: List[List[ProxyItem]] = [[] for _ in range(num_shards)]
+    for item in candidates: shards[shard_index_for(item, num_shards)].append(item)
+    return shards
+
+def authkey_from_environ() -> Optional[bytes]:
+    value = os.environ.get(AUTHKEY_ENV_VAR)
+    return bytes.fromhex(value) if value else None
+
+
+# --- Worker side ---
+
+def _serve_coordinator(conn, persistent: bool):
+    """Validates shards over one coordinator connection until the coordinator ends the session."""
+    from app.backend.proxy_validator import iter_validated_proxies
+
+    conn.send(("hello", {"pid": os.getpid(), "host": socket.gethostname(), "persistent": persistent}))
+    while True:
+        message = conn.recv()
+        if message[0] == "done": return
+        if message[0] != "shard": continue # e.g. a late "cancel" for a finished shard
+
+        shard = message[1]
+        cancel_event = threading.Event()
+        session_over = threading.Event()
+        shard_finished = threading.Event()
+
+        def watch_for_cancel():
+            # The main thread only sends, this thread only receives
+            while not shard_finished.is_set():
+                try:
+                    if not conn.poll(CANCEL_POLL_INTERVAL): continue
+                    kind = conn.recv()[0]
+                except (EOFError, OSError):
+                    kind = "done"
+                if kind in ("cancel", "done"):
+                    if kind == "done": session_over.set()
+                    cancel_event.set(); return
+
+        watcher = threading.Thread(target=watch_for_cancel, daemon=True)
+        watcher.start()
+        run_stats: Dict[str, Any] = {}
+        batch: List[Dict[str, Any]] = []
+        last_flush = time.monotonic()
+        try:
+            for item in iter_validated_proxies(
+                (ProxyItem(**d) for d in shard["candidates"]),
+                cancel_event=cancel_event,
+                run_stats=run_stats,
+                history=[ProxyItem(**d) for d in shard["history"]],
+                endpoint_labels={(ip, port): set(labels) for ip, port, labels in shard["endpoint_labels"]},
+                **shard["options"],
+            ):
+                batch.append(_dump_item(item))
+                if len(batch) >= RESULT_BATCH_SIZE or time.monotonic() - last_flush >= RESULT_FLUSH_INTERVAL:
+                    conn.send(("results", batch)); batch = []; last_flush = time.monotonic()
+            if batch: conn.send(("results", batch))
+        finally:
+            # Stop receiving before reporting completion, so the next shard message is not swallowed
+            shard_finished.set()
+            watcher.join()
+        if session_over.is_set(): return
+        conn.send(("shard_done", run_stats))
+
+def run_shard_worker(address: Tuple[str, int], authkey: bytes, reconnect: bool = False):
+    """
+    Connects to a coordinator and validates the shards it hands out. Without `reconnect`
+    (local workers spawned for one run) it returns once the coordinator has no more work.
+    With `reconnect` it stays connected across runs, and whenever the coordinator is
+    unreachable or goes away it retries with jittered exponential backoff. A rejected
+    key raises AuthenticationError, since retrying cannot fix it.
+    """
+    retry_delay = RECONNECT_BASE_DELAY
+    while True:
+        try:
+            with Client(address, authkey=authkey) as conn:
+                retry_delay = RECONNECT_BASE_DELAY
+                if reconnect: print(f"[SHARDING] Connected to coordinator {address[0]}:{address[1]}.")
+                _serve_coordinator(conn, persistent=reconnect)
+            if not reconnect: return
+            problem = "closed the connection"
+        except AuthenticationError: raise
+        except EOFError:
+            if not reconnect: raise
+            problem = "dropped the connection"
+        except OSError as e:
+            if not reconnect: raise
+            problem = f"unavailable ({e})"
+        sleep_for = retry_delay * random.uniform(1 - RECONNECT_JITTER, 1 + RECONNECT_JITTER)
+        print(f"[SHARDING] Coordinator {address[0]}:{address[1]} {problem}; retrying in {sleep_for:.1f}s.")
+        time.sleep(sleep_for)
+        retry_delay = min(RECONNECT_MAX_DELAY, retry_delay * 2)
+
+def _local_worker_main(address: Tuple[str, int], authkey: bytes):
+    try: run_shard_worker(address, authkey)
+    except (EOFError, OSError, AuthenticationError, KeyboardInterrupt): pass
+
+
+# --- Coordinator side ---
+
+class _WorkerConnection:
+    """A worker's connection; sends are locked because cancels come from other threads."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._send_lock = threading.Lock()
+
+    def send(self, message: tuple):
+        with self._send_lock: self.conn.send(message)
+
+    def recv(self) -> tuple:
+        return self.conn.recv()
+
+    def poll(self, timeout: float) -> bool:
+        return self.conn.poll(timeout)
+
+    def close(self):
+        self.conn.close()
+
+
+class _ShardRun:
+    """One run's shards, handed out by the coordinator's connection handler threads."""
+
+    def __init__(self, shard_payloads: List[Dict[str, Any]], deadline_at: Optional[float] = None):
+        self.shard_payloads = shard_payloads
+        self.deadline_at = deadline_at
+        self.pending_shards: "queue.Queue[int]" = queue.Queue()
+        self.attempts: Dict[int, int] = {}
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self.stop_event = threading.Event()
+        self.workers_seen = 0
+        self.lock = threading.Lock()
+        for index, payload in enumerate(shard_payloads):
+            if payload["candidates"]: self.pending_shards.put(index)
+
+    def serve(self, conn: _WorkerConnection):
+        """Feeds shards to one worker until the run ends. Re-raises if the worker is lost."""
+        with self.lock: self.workers_seen += 1
+        current_shard: Optional[int] = None
+        try:
+            while not self.stop_event.is_set():
+                try: current_shard = self.pending_shards.get(timeout=CANCEL_POLL_INTERVAL)
+                except queue.Empty: continue # A lost worker's shard may still be re-queued
+                with self.lock: self.attempts[current_shard] = self.attempts.get(current_shard, 0) + 1
+                payload = self.shard_payloads[current_shard]
+                if self.deadline_at is not None:
+                    # Workers get the time left in the run, not the full budget
+                    payload = dict(payload, options=dict(payload["options"], deadline_seconds=max(0.1, self.deadline_at - time.monotonic())))
+                conn.send(("shard", payload))
+                while True:
+                    kind, data = conn.recv()
+                    if kind == "results": self.events.put(("results", data))
+                    elif kind == "shard_done": self.events.put(("shard_done", data)); current_shard = None; break
+        except (EOFError, OSError) as e:
+            if current_shard is not None and not self.stop_event.is_set():
+                if self.attempts[current_shard] < MAX_SHARD_ATTEMPTS:
+                    print(f"[SHARDING] Worker lost during shard {current_shard} ({e}); re-queueing it.")
+                    self.pending_shards.put(current_shard)
+                else:
+                    print(f"[SHARDING] Worker lost during shard {current_shard} ({e}); giving up on it.")
+                    self.events.put(("shard_failed", current_shard))
+            raise
+
+
+class ShardCoordinator:
+    """
+    Accepts shard workers on `listen_address` and keeps them connected across runs; a
+    worker that is idle between runs picks up the next run's shards as soon as it starts.
+    Remote workers must present `authkey`, so one is required.
+    """
+
+    def __init__(self, listen_address: Tuple[str, int], authkey: Optional[bytes]):
+        if not authkey:
+            raise ValueError(f"A shard coordinator needs the key shared with its workers (set {AUTHKEY_ENV_VAR}).")
+        self.authkey = authkey
+        self._listener = Listener(listen_address, authkey=authkey)
+        host, port = self._listener.address
+        self.address: Tuple[str, int] = (host, port)
+        self.connect_address: Tuple[str, int] = ("127.0.0.1" if host in ("0.0.0.0", "") else host, port)
+        self._connections: List[_WorkerConnection] = []
+        self._run: Optional[_ShardRun] = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def connected_workers(self) -> int:
+        with self._lock: return len(self._connections)
+
+    def begin_run(self, shard_run: _ShardRun):
+        with self._lock: self._run = shard_run
+
+    def end_run(self, shard_run: _ShardRun, cancel: bool):
+        shard_run.stop_event.set()
+        with self._lock:
+            if self._run is shard_run: self._run = None
+            connections = list(self._connections)
+        if not cancel: return
+        for conn in connections:
+            try: conn.send(("cancel",)) # Idle workers ignore it
+            except OSError: pass
+
+    def close(self):
+        if self._closed.is_set(): return
+        self._closed.set()
+        try: socket.create_connection(self.connect_address, timeout=1).close() # Wakes the blocked accept()
+        except OSError: pass
+        self._listener.close()
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try: conn = self._listener.accept()
+            except Exception as e: # Failed authentication, a dropped handshake, or the wake-up connection at close
+                if self._closed.is_set(): return
+                print(f"[SHARDING] Rejected worker connection: {e}")
+                continue
+            threading.Thread(target=self._serve_worker, args=(_WorkerConnection(conn),), daemon=True).start()
+
+    def _next_run(self, conn: _WorkerConnection, previous_run: Optional[_ShardRun]) -> Optional[_ShardRun]:
+        while not self._closed.is_set():
+            with self._lock: run = self._run
+            if run is not None and run is not previous_run and not run.stop_event.is_set(): return run
+            if conn.poll(IDLE_POLL_INTERVAL): conn.recv() # Raises EOFError once an idle worker disconnects
+        return None
+
+    def _serve_worker(self, conn: _WorkerConnection):
+        try:
+            _, info = conn.recv() # hello
+            persistent = bool(info.get("persistent"))
+            with self._lock: self._connections.append(conn)
+            if persistent: print(f"[SHARDING] Worker {info.get('host')} (pid {info.get('pid')}) connected.")
+            served_run: Optional[_ShardRun] = None
+            while True:
+                served_run = self._next_run(conn, served_run)
+                if served_run is None: break
+                served_run.serve(conn)
+                if not persistent: break # Local workers are spawned for a single run
+            conn.send(("done",))
+        except (EOFError, OSError, ValueError, TypeError):
+            pass
+        finally:
+            with self._lock:
+                if conn in self._connections: self._connections.remove(conn)
+            conn.close()
+
+
+def iter_sharded_validated_proxies(
+    candidates: List[ProxyItem],
+    num_threads: int,
+    timeout: int,
+    test_url: str,
+    anonymity_test_url: str,
+    check_anonymity: bool,
+    deadline_seconds: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    run_stats: Optional[Dict[str, Any]] = None,
+    history: Optional[List[ProxyItem]] = None,
+    fingerprint: bool = False,
+    endpoint_labels: Optional[Dict[tuple, Set[str]]] = None,
+    collect_traces: bool = False,
+    local_workers: int = 0,
+    num_shards: Optional[int] = None,
+    coordinator: Optional[ShardCoordinator] = None,
+) -> Iterator[ProxyItem]:
+    """
+    Sharded counterpart of proxy_validator.iter_validated_proxies: same options and run_stats,
+    with `num_threads` applying to each shard worker. `local_workers` processes are spawned
+    for the run; remote workers join through a long-lived `coordinator`. Without one, a
+    private loopback coordinator is used for the run. When no worker is connected (after
+    WORKER_JOIN_GRACE_SECONDS when remote workers may join) the run stops early. A run that
+    gave up on any shard reports stop_reason "shards_failed", so callers treat it as partial.
+    """
+    from app.backend.proxy_validator import REAL_IP, REAL_IP_ENV_VAR
+
+    if local_workers <= 0 and coordinator is None:
+        raise ValueError("Sharded validation needs local workers or a coordinator for remote workers.")
+    run_started = time.monotonic()
+    if run_stats is None: run_stats = {}
+    run_stats.update({"completed": 0, "abandoned": 0, "stop_reason": None, "duration_seconds": 0.0,
+                      "time_to_first_valid_seconds": None, "protocol_corrections": 0})
+    deadline_at = run_started + deadline_seconds if deadline_seconds else None
+
+    owns_coordinator = coordinator is None
+    if owns_coordinator: coordinator = ShardCoordinator(("127.0.0.1", 0), os.urandom(32))
+    num_shards = num_shards or max(1, local_workers + coordinator.connected_workers()) * SHARDS_PER_WORKER
+    shards = split_into_shards(candidates, num_shards)
+    history_by_endpoint: Dict[tuple, List[Dict[str, Any]]] = {}
+    for item in history or []:
+        if item.is_valid: history_by_endpoint.setdefault((item.ip, item.port), []).append(_dump_item(item))
+    options = {"num_threads": num_threads, "timeout": timeout, "test_url": test_url,
+               "anonymity_test_url": anonymity_test_url, "check_anonymity": check_anonymity,
+               "deadline_seconds": deadline_seconds, "fingerprint": fingerprint, "collect_traces": collect_traces}
+    shard_payloads = []
+    for index, shard in enumerate(shards):
+        endpoints = {(item.ip, item.port) for item in shard}
+        shard_payloads.append({
+            "shard_index": index,
+            "candidates": [_dump_item(item) for item in shard],
+            "history": [d for endpoint in endpoints for d in history_by_endpoint.get(endpoint, [])],
+            "endpoint_labels": [(ip, port, sorted(labels)) for (ip, port), labels in (endpoint_labels or {}).items() if (ip, port) in endpoints],
+            "options": options,
+        })
+    shard_run = _ShardRun(shard_payloads, deadline_at)
+    remaining_shards = shard_run.pending_shards.qsize()
+    run_stats["shards"] = {"total": remaining_shards, "completed": 0, "failed": 0, "workers": 0}
+    coordinator.begin_run(shard_run)
+
+    if REAL_IP: os.environ.setdefault(REAL_IP_ENV_VAR, REAL_IP)
+    ctx = multiprocessing.get_context("spawn") # The caller usually has threads running; avoid fork
+    local_procs = [ctx.Process(target=_local_worker_main, args=(coordinator.connect_address, coordinator.authkey), daemon=True)
+                   for _ in range(min(local_workers, remaining_shards))]
+    for proc in local_procs: proc.start()
+    print(f"[SHARDING] {remaining_shards} shards, {len(local_procs)} local workers, "
+          f"{coordinator.connected_workers()} connected, coordinator on {coordinator.address[0]}:{coordinator.address[1]}")
+
+    worker_grace = 0 if owns_coordinator else WORKER_JOIN_GRACE_SECONDS
+    no_workers_since: Optional[float] = None
+    seen_keys: Set[tuple] = set() # A re-queued shard may resend results
+    stop_reason: Optional[str] = None
+    try:
+        while remaining_shards > 0:
+            if cancel_event is not None and cancel_event.is_set(): stop_reason = "cancelled"; break
+            if deadline_at is not None and time.monotonic() >= deadline_at: stop_reason = "deadline"; break
+            if coordinator.connected_workers() == 0 and shard_run.events.empty() \
+                    and not any(proc.is_alive() for proc in local_procs):
+                if no_workers_since is None: no_workers_since = time.monotonic()
+                if time.monotonic() - no_workers_since >= worker_grace:
+                    stop_reason = "workers_lost" if shard_run.workers_seen else "no_workers"
+                    print(f"[SHARDING] No shard workers connected; stopping the run ({stop_reason}).")
+                    break
+            else: no_workers_since = None
+
+            try: kind, data = shard_run.events.get(timeout=CANCEL_POLL_INTERVAL)
+            except queue.Empty: continue
+            if kind == "results":
+                for item_data in data:
+                    item = ProxyItem(**item_data)
+                    key = (item.ip, item.port, item.protocol)
+                    if key in seen_keys: continue
+                    seen_keys.add(key)
+                    run_stats["completed"] += 1
+                    if item.is_valid and run_stats["time_to_first_valid_seconds"] is None:
+                        run_stats["time_to_first_valid_seconds"] = round(time.monotonic() - run_started, 2)
+                    yield item
+            elif kind == "shard_done":
+                remaining_shards -= 1; run_stats["shards"]["completed"] += 1
+                run_stats["protocol_corrections"] += data.get("protocol_corrections", 0)
+            elif kind == "shard_failed":
+                remaining_shards -= 1; run_stats["shards"]["failed"] += 1
+    finally:
+        coordinator.end_run(shard_run, cancel=remaining_shards > 0)
+        for proc in local_procs: proc.join(timeout=2)
+        for proc in local_procs:
+            if proc.is_alive(): proc.terminate()
+        if owns_coordinator: coordinator.close()
+        run_stats["shards"]["workers"] = shard_run.workers_seen
+        run_stats["abandoned"] = len(candidates) - run_stats["completed"]
+        if stop_reason is None and run_stats["shards"]["failed"]: stop_reason = "shards_failed"
+        run_stats["stop_reason"] = stop_reason
+        run_stats["duration_seconds"] = round(time.monotonic() - run_started, 2)
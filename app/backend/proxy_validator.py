@@ -1,14 +1,22 @@
 # app/backend/proxy_validator.py
+import os
 import requests
+import threading
 import time
 from datetime import datetime
-from typing import List, Optional, Dict, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Set, Any, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
+import functools
 import pycountry # Import pycountry
 
 from .models import ProxyItem
 from app.backend.providers import get_all_proxies
+from app.backend.proxy_priority import ProxyPriorityQueue, PriorityHistory
+from app.backend.protocol_probe import fingerprint_protocols, preferred_protocol, PROTOCOL_PROBE_TIMEOUT
+from app.backend.probe_trace import traced_get, summarize_traces, ProbeError
+from app.backend.negative_cache import NegativeCache
+from app.backend.proxy_sharding import ShardCoordinator, iter_sharded_validated_proxies
 
 # Constants
 DEFAULT_THREADS = 50
@@ -16,6 +24,8 @@ REQUEST_TIMEOUT = 12  # Main connectivity test timeout (increased slightly)
 ANONYMITY_REQUEST_TIMEOUT = 10 # Anonymity check timeout (increased)
 DEFAULT_TEST_URL = "https://ipinfo.io/json"
 ANONYMITY_TEST_URL = "https://httpbin.org/get?show_env=1"
+CANCEL_POLL_INTERVAL = 0.5 # Seconds between deadline/cancellation checks while waiting on probes
+SUBMIT_WINDOW_PER_THREAD = 2 # Probes queued in the executor per worker thread; the rest wait in priority order
 
 # Common browser user agent
 COMMON_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -34,7 +44,8 @@ def get_my_real_ip(timeout=7) -> Optional[str]:
     print("[VALIDATOR_WARNING] Could not fetch real IP from any source.")
     return None
 
-REAL_IP = get_my_real_ip()
+REAL_IP_ENV_VAR = "PROXY_VALIDATOR_REAL_IP" # Lets shard worker processes reuse the parent's lookup
+REAL_IP = os.environ.get(REAL_IP_ENV_VAR) or get_my_real_ip()
 if REAL_IP: print(f"[VALIDATOR_INFO] Real IP detected: {REAL_IP}")
 else: print("[VALIDATOR_WARNING] Real IP could not be determined. Anonymity checks will be affected.")
 
@@ -48,25 +59,36 @@ def get_country_name_from_code(country_code: Optional[str]) -> Optional[str]:
     except Exception: # Handles LookupError if code is invalid, or other issues
         return None # Or return the original code if preferred: country_code.upper()
 
-def test_single_proxy(proxy_item: ProxyItem, timeout: int, test_url: str, anonymity_test_url: str, check_anonymity: bool) -> ProxyItem:
+def test_single_proxy(proxy_item: ProxyItem, timeout: int, test_url: str, anonymity_test_url: str, check_anonymity: bool,
+                      cancel_event: Optional[threading.Event] = None, collect_trace: bool = False) -> ProxyItem:
+    # collect_trace swaps the main request for probe_trace.traced_get, which records per-phase timings
+    # and mirrors the requests.get call below (redirects, DNS, TLS, timeouts) so verdicts don't change
     proxy_dict = {"http": proxy_item.proxy_string(), "https": proxy_item.proxy_string()}
     
     proxy_item.is_valid = False
     proxy_item.response_time = None
     proxy_item.anonymity = "N/A"
     proxy_item.last_checked = datetime.now().isoformat()
+    proxy_item.probe_trace = None
     # Country will be set/updated later
 
     start_time_main_test = time.perf_counter()
     try:
-        response = requests.get(test_url, proxies=proxy_dict, timeout=timeout, headers=REQUEST_HEADERS, allow_redirects=True)
-        response.raise_for_status()
-        
+        if collect_trace:
+            status_code, body, trace = traced_get(proxy_item, test_url, timeout, REQUEST_HEADERS)
+            proxy_item.probe_trace = trace.to_list()
+            if status_code >= 400: raise requests.exceptions.HTTPError(f"{status_code} Error for url: {test_url}")
+            parse_response_json = lambda: json.loads(body)
+        else:
+            response = requests.get(test_url, proxies=proxy_dict, timeout=timeout, headers=REQUEST_HEADERS, allow_redirects=True)
+            response.raise_for_status()
+            parse_response_json = response.json
+
         proxy_item.response_time = round((time.perf_counter() - start_time_main_test) * 1000, 2)
         proxy_item.is_valid = True
 
         try:
-            data = response.json()
+            data = parse_response_json()
             country_code_from_ipinfo = data.get("country")
             if country_code_from_ipinfo:
                 full_country_name = get_country_name_from_code(country_code_from_ipinfo)
@@ -78,7 +100,8 @@ def test_single_proxy(proxy_item: ProxyItem, timeout: int, test_url: str, anonym
         except Exception as e_ipinfo_parse:
             print(f"[VALIDATOR_WARNING] Proxy {proxy_item.proxy_string()} - Error parsing ipinfo response: {e_ipinfo_parse}")
 
-        if check_anonymity:
+        if cancel_event is not None and cancel_event.is_set(): proxy_item.anonymity = "Not Checked (Cancelled)"
+        elif check_anonymity:
             if not REAL_IP: proxy_item.anonymity = "Unknown (No Real IP)"
             else:
                 try:
@@ -110,6 +133,9 @@ def test_single_proxy(proxy_item: ProxyItem, timeout: int, test_url: str, anonym
     except requests.exceptions.ConnectionError: proxy_item.is_valid = False
     except requests.exceptions.HTTPError: proxy_item.is_valid = False
     except requests.exceptions.RequestException: proxy_item.is_valid = False
+    except ProbeError as e:
+        proxy_item.is_valid = False
+        proxy_item.probe_trace = e.trace.to_list() if getattr(e, "trace", None) else None
 
     if not proxy_item.is_valid:
         proxy_item.response_time = None
@@ -120,6 +146,110 @@ def test_single_proxy(proxy_item: ProxyItem, timeout: int, test_url: str, anonym
     return proxy_item
 
 
+def probe_endpoint(proxy_item: ProxyItem, labelled_protocols: Set[str], timeout: int, test_url: str, anonymity_test_url: str,
+                   check_anonymity: bool, cancel_event: Optional[threading.Event] = None, collect_trace: bool = False) -> ProxyItem:
+    """Fingerprints the endpoint's protocols, then runs the full test once using the preferred one."""
+    verified = fingerprint_protocols(proxy_item.ip, proxy_item.port, timeout=min(timeout, PROTOCOL_PROBE_TIMEOUT),
+                                     labelled_protocols=labelled_protocols)
+    proxy_item.verified_protocols = sorted(verified)
+    primary_protocol = preferred_protocol(verified)
+    if primary_protocol is None:
+        proxy_item.is_valid = False; proxy_item.response_time = None
+        proxy_item.anonymity = "N/A"; proxy_item.last_checked = datetime.now().isoformat()
+        return proxy_item
+    proxy_item.protocol = primary_protocol
+    return test_single_proxy(proxy_item, timeout, test_url, anonymity_test_url, check_anonymity, cancel_event, collect_trace)
+
+
+def iter_validated_proxies(
+    candidates: Iterable[ProxyItem],
+    num_threads: int = DEFAULT_THREADS,
+    timeout: int = REQUEST_TIMEOUT,
+    test_url: str = DEFAULT_TEST_URL,
+    anonymity_test_url: str = ANONYMITY_TEST_URL,
+    check_anonymity: bool = True,
+    deadline_seconds: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    run_stats: Optional[Dict[str, Any]] = None,
+    history: Optional[List[ProxyItem]] = None,
+    fingerprint: bool = False,
+    endpoint_labels: Optional[Dict[tuple, Set[str]]] = None,
+    collect_traces: bool = False,
+    queue_capacity: Optional[int] = None,
+) -> Iterator[ProxyItem]:
+    """
+    The probe engine behind validate_all_proxies: yields proxies as their probes complete.
+
+    `candidates` is consumed lazily; with `queue_capacity` set, at most that many wait in
+    the priority queue, so arbitrarily long inputs run in bounded memory. `endpoint_labels`
+    maps (ip, port) to the protocols claimed for it when fingerprinting (defaults to the
+    item's own protocol). Closing the generator early abandons outstanding probes.
+    """
+    run_started = time.monotonic()
+    if run_stats is None: run_stats = {}
+    run_stats.update({"completed": 0, "abandoned": 0, "stop_reason": None,
+                      "duration_seconds": 0.0, "time_to_first_valid_seconds": None,
+                      "protocol_corrections": 0})
+
+    deadline_at = run_started + deadline_seconds if deadline_seconds else None
+    stop_reason: Optional[str] = None
+    exhausted = False
+    # No context manager: on cancellation we must not block on in-flight probes
+    executor = ThreadPoolExecutor(max_workers=num_threads)
+    probe_queue = ProxyPriorityQueue(candidates, history=PriorityHistory(history), capacity=queue_capacity)
+    submit_window = max(1, num_threads * SUBMIT_WINDOW_PER_THREAD)
+    future_to_proxy: Dict[Any, tuple] = {}
+    pending: Set[Any] = set()
+
+    def top_up():
+        while len(pending) < submit_window:
+            next_item = probe_queue.pop()
+            if next_item is None: return
+            labels = (endpoint_labels or {}).get((next_item.ip, next_item.port)) or {next_item.protocol}
+            if fingerprint:
+                probe_fn = functools.partial(probe_endpoint, next_item, labels)
+            else:
+                probe_fn = functools.partial(test_single_proxy, next_item)
+            future = executor.submit(probe_fn, timeout, test_url, anonymity_test_url, check_anonymity, cancel_event, collect_traces)
+            future_to_proxy[future] = (next_item, labels)
+            pending.add(future)
+
+    try:
+        top_up()
+        while pending:
+            if cancel_event is not None and cancel_event.is_set(): stop_reason = "cancelled"; break
+            wait_timeout = CANCEL_POLL_INTERVAL
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0: stop_reason = "deadline"; break
+                wait_timeout = min(wait_timeout, remaining)
+
+            done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                original_proxy_item, labels = future_to_proxy.pop(future)
+                try:
+                    updated_proxy_item = future.result()
+                    if updated_proxy_item.is_valid and run_stats["time_to_first_valid_seconds"] is None:
+                        run_stats["time_to_first_valid_seconds"] = round(time.monotonic() - run_started, 2)
+                    if fingerprint and updated_proxy_item.verified_protocols and not set(updated_proxy_item.verified_protocols) & labels:
+                        run_stats["protocol_corrections"] += 1
+                except Exception as exc:
+                    print(f"[VALIDATOR_ERROR] Proxy {original_proxy_item.proxy_string()} task failed: {exc}")
+                    original_proxy_item.is_valid = False; original_proxy_item.response_time = None
+                    original_proxy_item.anonymity = "Error (Task Failed)"; original_proxy_item.last_checked = datetime.now().isoformat()
+                    updated_proxy_item = original_proxy_item
+                run_stats["completed"] += 1
+                yield updated_proxy_item
+            top_up()
+        exhausted = stop_reason is None
+    finally:
+        # Drops queued probes; in-flight ones are abandoned when stopping early
+        executor.shutdown(wait=exhausted, cancel_futures=True)
+        run_stats["abandoned"] = len(pending) + len(probe_queue)
+        run_stats["stop_reason"] = stop_reason or (None if exhausted else "closed")
+        run_stats["duration_seconds"] = round(time.monotonic() - run_started, 2)
+
+
 def validate_all_proxies(
     proxy_list_input: Optional[List[ProxyItem]] = None,
     num_threads: int = DEFAULT_THREADS,
@@ -127,8 +257,44 @@ def validate_all_proxies(
     test_url: str = DEFAULT_TEST_URL, 
     anonymity_test_url: str = ANONYMITY_TEST_URL,
     check_anonymity: bool = True,
+    deadline_seconds: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    run_stats: Optional[Dict[str, Any]] = None,
+    history: Optional[List[ProxyItem]] = None,
+    fingerprint: bool = False,
+    collect_traces: bool = False,
+    shard_processes: int = 0,
+    shard_coordinator: Optional[ShardCoordinator] = None,
+    negative_cache: Optional[NegativeCache] = None,
 ) -> List[ProxyItem]:
-    
+    """
+    Validates proxies concurrently and returns the probed items.
+
+    The run stops early when `deadline_seconds` elapses or `cancel_event` is set: queued
+    probes are cancelled, in-flight probes are abandoned (they end on their own socket
+    timeouts) and only the proxies completed so far are returned. If `run_stats` is
+    given it is filled with counters describing the run.
+
+    Probes are issued in priority order (see proxy_priority.py), using `history` - the
+    previous run's results - so likely-good proxies are confirmed first.
+
+    With `fingerprint`, entries sharing an ip:port are collapsed into one probe that
+    first detects the protocols the endpoint really speaks (see protocol_probe.py).
+
+    With `collect_traces`, every probe stores per-phase timings on the item and
+    run_stats["trace_summary"] aggregates them for the run (see probe_trace.py).
+
+    With `shard_processes` (or a `shard_coordinator` that remote workers connect to) the
+    candidates are split across worker processes, each running its own engine (see proxy_sharding.py).
+
+    With a `negative_cache`, proxies still backing off after repeated failures are skipped
+    (counted in run_stats["negative_cache_skipped"]) and every result updates the cache.
+    """
+    if run_stats is None: run_stats = {}
+    run_stats.update({"candidates": 0, "completed": 0, "abandoned": 0, "stop_reason": None,
+                      "duration_seconds": 0.0, "time_to_first_valid_seconds": None,
+                      "protocol_corrections": 0, "negative_cache_skipped": 0})
+
     source_proxies = get_all_proxies() if proxy_list_input is None else proxy_list_input
     
     # De-duplicate based on (ip, port, protocol) AND pre-populate country from providers if possible
@@ -148,7 +314,25 @@ def validate_all_proxies(
 
 
     proxies_to_validate: List[ProxyItem] = list(unique_proxies_map.values())
+    if negative_cache is not None:
+        now = time.time()
+        eligible = [p for p in proxies_to_validate if not negative_cache.is_suppressed((p.ip, p.port, p.protocol), now)]
+        run_stats["negative_cache_skipped"] = len(proxies_to_validate) - len(eligible)
+        if run_stats["negative_cache_skipped"]:
+            print(f"[VALIDATOR] Skipping {run_stats['negative_cache_skipped']} proxies still backing off after repeated failures.")
+        proxies_to_validate = eligible
+    endpoint_labels: Dict[tuple, Set[str]] = {}
+    if fingerprint:
+        # One probe per ip:port; remember every protocol the providers claimed for it
+        endpoint_items: Dict[tuple, ProxyItem] = {}
+        for p_item in proxies_to_validate:
+            endpoint = (p_item.ip, p_item.port)
+            endpoint_labels.setdefault(endpoint, set()).add(p_item.protocol)
+            if endpoint not in endpoint_items: endpoint_items[endpoint] = p_item
+            elif not endpoint_items[endpoint].country and p_item.country: endpoint_items[endpoint].country = p_item.country
+        proxies_to_validate = list(endpoint_items.values())
     total_to_validate = len(proxies_to_validate)
+    run_stats["candidates"] = total_to_validate
     
     if total_to_validate > 0:
         print(f"[VALIDATOR] Validating {total_to_validate} unique proxies (source: {len(source_proxies)}) with {num_threads} threads. Test URL: {test_url}")
@@ -157,28 +341,38 @@ def validate_all_proxies(
 
     if not REAL_IP and check_anonymity: print("[VALIDATOR_WARNING] Real IP not available, anonymity accuracy will be low.")
 
+    engine_options = dict(
+        num_threads=num_threads, timeout=timeout, test_url=test_url,
+        anonymity_test_url=anonymity_test_url, check_anonymity=check_anonymity,
+        deadline_seconds=deadline_seconds, cancel_event=cancel_event, run_stats=run_stats,
+        history=history, fingerprint=fingerprint, endpoint_labels=endpoint_labels, collect_traces=collect_traces,
+    )
+    if shard_processes > 0 or shard_coordinator is not None:
+        engine = iter_sharded_validated_proxies(proxies_to_validate, local_workers=shard_processes,
+                                                coordinator=shard_coordinator, **engine_options)
+    else:
+        engine = iter_validated_proxies(proxies_to_validate, **engine_options)
+
     results: List[ProxyItem] = []
-    processed_count = 0
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        future_to_proxy = {
-            executor.submit(test_single_proxy, proxy_item, timeout, test_url, anonymity_test_url, check_anonymity): proxy_item
-            for proxy_item in proxies_to_validate
-        }
-        for future in as_completed(future_to_proxy):
-            original_proxy_item = future_to_proxy[future]
-            try:
-                updated_proxy_item = future.result()
-                results.append(updated_proxy_item)
-            except Exception as exc:
-                print(f"[VALIDATOR_ERROR] Proxy {original_proxy_item.proxy_string()} task failed: {exc}")
-                original_proxy_item.is_valid = False; original_proxy_item.response_time = None
-                original_proxy_item.anonymity = "Error (Task Failed)"; original_proxy_item.last_checked = datetime.now().isoformat()
-                results.append(original_proxy_item)
-            
-            processed_count += 1
-            if total_to_validate > 0: print(f"[VALIDATOR] Progress: {processed_count}/{total_to_validate} ({((processed_count/total_to_validate)*100):.1f}%)", end='\r', flush=True)
-
-    if total_to_validate > 0: print()
+    for updated_proxy_item in engine:
+        results.append(updated_proxy_item)
+        if negative_cache is not None:
+            # With fingerprinting, the outcome applies to every protocol claimed for the endpoint
+            claimed = endpoint_labels.get((updated_proxy_item.ip, updated_proxy_item.port)) or {updated_proxy_item.protocol}
+            if updated_proxy_item.is_valid:
+                protocols = claimed | set(updated_proxy_item.verified_protocols or [])
+                negative_cache.record_success((updated_proxy_item.ip, updated_proxy_item.port, p) for p in protocols)
+            else:
+                negative_cache.record_failure((updated_proxy_item.ip, updated_proxy_item.port, p) for p in claimed)
+        print(f"[VALIDATOR] Progress: {len(results)}/{total_to_validate} ({((len(results)/total_to_validate)*100):.1f}%)", end='\r', flush=True)
+
+    print()
+    if negative_cache is not None: negative_cache.save()
+    stop_reason = run_stats["stop_reason"]
+    if collect_traces: run_stats["trace_summary"] = summarize_traces(results)
     valid_count_final = sum(1 for p in results if p.is_valid)
-    print(f"[VALIDATOR] Validation complete. Results: {len(results)} processed, {valid_count_final} valid.")
-    return results
\ No newline at end of file
+    if stop_reason:
+        print(f"[VALIDATOR] Validation stopped early ({stop_reason}). Results: {len(results)} processed, {run_stats['abandoned']} abandoned, {valid_count_final} valid.")
+    else:
+        print(f"[VALIDATOR] Validation complete. Results: {len(results)} processed, {valid_count_final} valid.")
+    return results
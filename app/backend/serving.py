@@ -0,0 +1,234 @@
+# app/backend/serving.py
+"""
+Production serving mode: one scheduler/validator process and N API worker processes.
+
+The parent process owns the ProxyScheduler and publishes every finished pool to a
+shared-memory snapshot (see pool_snapshot.py). Workers are forked after the listening
+socket is bound, so they all accept() on the same socket. Read endpoints are served
+from the snapshot - GET /proxies returns the bytes the scheduler serialized at publish
+time - and scheduler control calls are forwarded to the parent over a local
+multiprocessing.connection channel.
+
+Usage: python -m app.backend.serving --workers 4 --port 8000
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+from multiprocessing.connection import Listener, Client
+from typing import List, Optional, Dict, Any, Tuple
+
+from app.backend.models import ProxyItem
+from app.backend.pool_snapshot import PoolSnapshotReader, PoolSnapshotWriter, default_snapshot_path
+from app.backend.proxy_sharding import authkey_from_environ, AUTHKEY_ENV_VAR
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+CONTROL_HOST = "127.0.0.1"
+
+# Environment variables read by main.py inside worker processes
+ENV_SERVING_ROLE = "PROXY_SERVING_ROLE"
+ENV_SNAPSHOT_PATH = "PROXY_SNAPSHOT_PATH"
+ENV_CONTROL_ADDRESS = "PROXY_CONTROL_ADDRESS"
+ENV_CONTROL_AUTHKEY = "PROXY_CONTROL_AUTHKEY"
+WORKER_ROLE = "worker"
+
+# Scheduler methods a worker may invoke on the scheduler process
+CONTROL_METHODS = frozenset({
+    "start", "stop", "pause", "resume", "refresh_now",
+    "set_interval", "set_validation_threads", "get_status",
+    "cancel_validation", "set_sweep_deadline", "set_trace_collection",
+})
+
+
+class SchedulerControlServer:
+    """Runs in the scheduler process and executes control calls sent by API workers."""
+
+    def __init__(self, scheduler, listener: Listener):
+        self.scheduler = scheduler
+        self.listener = listener
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try: conn = self.listener.accept()
+            except OSError: return # Listener closed
+            except Exception as e: print(f"[SERVING] Rejected control connection: {e}"); continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                method_name, args = conn.recv()
+                if method_name not in CONTROL_METHODS:
+                    conn.send(("error", f"Unknown control method: {method_name}"))
+                    return
+                conn.send(("ok", getattr(self.scheduler, method_name)(*args)))
+            except EOFError: return
+            except Exception as e:
+                print(f"[SERVING] Control call failed: {e}")
+                try: conn.send(("error", str(e)))
+                except OSError: pass
+
+
+class RemoteScheduler:
+    """
+    Stand-in for ProxyScheduler inside API worker processes. Control calls go to the
+    scheduler process; proxy reads come from the shared-memory pool snapshot.
+    """
+
+    def __init__(self, control_address: Tuple[str, int], authkey: bytes, snapshot_path: str):
+        self.control_address = control_address
+        self.authkey = authkey
+        self.snapshot = PoolSnapshotReader(snapshot_path)
+
+    @classmethod
+    def from_environ(cls) -> "RemoteScheduler":
+        host, port = os.environ[ENV_CONTROL_ADDRESS].rsplit(":", 1)
+        return cls(
+            control_address=(host, int(port)),
+            authkey=bytes.fromhex(os.environ[ENV_CONTROL_AUTHKEY]),
+            snapshot_path=os.environ.get(ENV_SNAPSHOT_PATH) or default_snapshot_path(),
+        )
+
+    def _call(self, method_name: str, *args):
+        with Client(self.control_address, authkey=self.authkey) as conn:
+            conn.send((method_name, args))
+            outcome, value = conn.recv()
+        if outcome != "ok": raise RuntimeError(value)
+        return value
+
+    def start(self): return self._call("start")
+    def stop(self): return self._call("stop")
+    def pause(self): return self._call("pause")
+    def resume(self): return self._call("resume")
+    def refresh_now(self, background: bool = True): return self._call("refresh_now", background)
+    def set_interval(self, seconds: int): return self._call("set_interval", seconds)
+    def set_validation_threads(self, num_threads: int): return self._call("set_validation_threads", num_threads)
+    def cancel_validation(self): return self._call("cancel_validation")
+    def set_sweep_deadline(self, seconds: Optional[int]): return self._call("set_sweep_deadline", seconds)
+    def set_trace_collection(self, enabled: bool): return self._call("set_trace_collection", enabled)
+
+    def get_status(self) -> Dict[str, Any]:
+        status = self._call("get_status")
+        # Counts reflect what this worker actually serves, not the scheduler's in-memory pool
+        status.update(self.snapshot.get_info())
+        return status
+
+    def get_proxies(self, only_valid: bool = True) -> List[ProxyItem]:
+        return self.snapshot.get_proxies(only_valid=only_valid)
+
+    def get_proxies_body(self, only_valid: bool = True) -> bytes:
+        return self.snapshot.get_proxies_body(only_valid=only_valid)
+
+
+def _worker_main(listen_fd: int, host: str, port: int, snapshot_path: str,
+                 control_address: Tuple[str, int], authkey: bytes):
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Parent handles Ctrl+C and terminates workers
+    os.environ[ENV_SERVING_ROLE] = WORKER_ROLE
+    os.environ[ENV_SNAPSHOT_PATH] = snapshot_path
+    os.environ[ENV_CONTROL_ADDRESS] = f"{control_address[0]}:{control_address[1]}"
+    os.environ[ENV_CONTROL_AUTHKEY] = authkey.hex()
+
+    from werkzeug.serving import make_server
+    from app.backend.main import app
+
+    server = make_server(host, port, app, threaded=True, fd=listen_fd)
+    print(f"[SERVING] API worker {os.getpid()} accepting on {host}:{port}")
+    server.serve_forever()
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: Optional[int] = None,
+          snapshot_path: Optional[str] = None, interval_seconds: Optional[int] = None,
+          validation_threads: Optional[int] = None, autostart: bool = False,
+          shard_processes: int = 0, shard_listen_address: Optional[Tuple[str, int]] = None):
+    from app.backend.proxy_scheduler import ProxyScheduler, DEFAULT_SCHEDULER_INTERVAL, DEFAULT_PROXY_SCHEDULER_THREADS
+
+    num_workers = workers or os.cpu_count() or 1
+    listen_sock = socket.create_server((host, port), backlog=256)
+    listen_sock.set_inheritable(True)
+    # Named after the port this instance just bound, so instances on one host never share a snapshot
+    snapshot_writer = PoolSnapshotWriter(snapshot_path or default_snapshot_path(listen_sock.getsockname()[1]))
+    snapshot_writer.publish([]) # Workers always find a snapshot, even before the first run
+
+    authkey = os.urandom(32)
+    control_listener = Listener((CONTROL_HOST, 0), authkey=authkey)
+
+    # Fork workers before any scheduler thread exists
+    ctx = multiprocessing.get_context("fork")
+    worker_procs: List[multiprocessing.Process] = []
+    for _ in range(num_workers):
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(listen_sock.fileno(), host, port, snapshot_writer.path, control_listener.address, authkey),
+            daemon=True,
+        )
+        proc.start()
+        worker_procs.append(proc)
+
+    scheduler = ProxyScheduler(
+        initial_interval_seconds=interval_seconds or DEFAULT_SCHEDULER_INTERVAL,
+        initial_validation_threads=validation_threads or DEFAULT_PROXY_SCHEDULER_THREADS,
+        snapshot_writer=snapshot_writer,
+        shard_processes=shard_processes,
+        shard_listen_address=shard_listen_address,
+    )
+    SchedulerControlServer(scheduler, control_listener).start()
+    print(f"[SERVING] Scheduler process {os.getpid()} with {num_workers} API workers on {host}:{port}. Snapshot: {snapshot_writer.path}")
+    if autostart: scheduler.start()
+
+    shutdown_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: shutdown_event.set())
+    try:
+        while not shutdown_event.is_set():
+            if not any(proc.is_alive() for proc in worker_procs):
+                print("[SERVING] All API workers exited."); break
+            shutdown_event.wait(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[SERVING] Shutting down...")
+        for proc in worker_procs: proc.terminate()
+        for proc in worker_procs: proc.join(timeout=5)
+        scheduler.shutdown()
+        control_listener.close()
+        listen_sock.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve the proxy API with one scheduler process and several API workers.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="API worker processes (default: CPU count)")
+    parser.add_argument("--snapshot-path", default=None, help="Pool snapshot file (default: proxy_pool.<port>.snapshot in /dev/shm when available)")
+    parser.add_argument("--interval", type=int, default=None, help="Scheduler interval in seconds")
+    parser.add_argument("--threads", type=int, default=None, help="Validation threads")
+    parser.add_argument("--autostart", action="store_true", help="Start the scheduler immediately")
+    parser.add_argument("--shard-processes", type=int, default=0, help="Validate in this many worker processes")
+    parser.add_argument("--shard-listen", default=None, metavar="HOST:PORT",
+                        help="Accept remote shard workers here (key in PROXY_SHARD_AUTHKEY)")
+    args = parser.parse_args(argv)
+    shard_listen_address = None
+    if args.shard_listen:
+        if not authkey_from_environ():
+            parser.error(f"--shard-listen needs the key shared with remote workers in {AUTHKEY_ENV_VAR} (hex)")
+        shard_host, shard_port = args.shard_listen.rsplit(":", 1)
+        shard_listen_address = (shard_host, int(shard_port))
+
+    if not hasattr(os, "fork"):
+        print("Multi-worker serving requires a platform with fork(). Use main.py instead.")
+        sys.exit(1)
+    serve(host=args.host, port=args.port, workers=args.workers, snapshot_path=args.snapshot_path,
+          interval_seconds=args.interval, validation_threads=args.threads, autostart=args.autostart,
+          shard_processes=args.shard_processes, shard_listen_address=shard_listen_address)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ export interface ApiProxyItem {
   last_checked?: string | null;
   response_time?: number | null; // Raw number from API
   is_valid: boolean;
+  verified_protocols?: string[] | null;
 }
 
 export interface ProxyDisplayInfo {
@@ -32,4 +33,13 @@ export interface SchedulerStatus {
   next_run_time?: string | null;
   current_proxy_count: number;
   valid_proxy_count: number;
+  snapshot_version?: number | null;
+  snapshot_published_at?: string | null;
+  sweep_deadline_seconds?: number | null;
+  last_run_stats?: Record<string, unknown> | null;
+  collect_traces?: boolean;
+  provider_cache?: Record<string, number> | null;
+  shard_processes?: number;
+  shard_workers_connected?: number;
+  negative_cache?: Record<string, number> | null;
 }
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# proxy_validator looks up the machine's public IP on import; tests run offline
+os.environ.setdefault("PROXY_VALIDATOR_REAL_IP", "203.0.113.1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import pytest
+
+from app.backend.cli import iter_input_proxies, main, parse_proxy_line
+
+
+def test_plain_ip_port_uses_default_protocol():
+    item = parse_proxy_line("1.2.3.4:8080\n", "socks5", "cli:test")
+    assert (item.ip, item.port, item.protocol, item.source) == ("1.2.3.4", 8080, "socks5", "cli:test")
+
+
+def test_proxy_url_sets_protocol():
+    item = parse_proxy_line("SOCKS4://5.6.7.8:1080", "http", "cli:test")
+    assert (item.ip, item.port, item.protocol) == ("5.6.7.8", 1080, "socks4")
+
+
+def test_ndjson_line_keeps_fields():
+    item = parse_proxy_line('{"ip": "9.9.9.9", "port": 3128, "protocol": "HTTPS", "country": "DE"}', "http", "cli:test")
+    assert (item.ip, item.port, item.protocol, item.country, item.source) == ("9.9.9.9", 3128, "https", "DE", "cli:test")
+
+
+@pytest.mark.parametrize("line", ["", "   ", "# comment"])
+def test_blank_and_comment_lines_are_skipped(line):
+    assert parse_proxy_line(line, "http", "cli:test") is None
+
+
+@pytest.mark.parametrize("line", ["1.2.3.4", "1.2.3.4:notaport", "ftp://1.2.3.4:21", "http://1.2.3.4"])
+def test_malformed_lines_raise_value_error(line):
+    with pytest.raises(ValueError):
+        parse_proxy_line(line, "http", "cli:test")
+
+
+def test_unreadable_input_file_is_reported_and_skipped(tmp_path, capsys):
+    good = tmp_path / "proxies.txt"
+    good.write_text("1.2.3.4:8080\n")
+    stats = {"read": 0, "invalid_lines": 0, "duplicates": 0, "unreadable_files": 0}
+    items = list(iter_input_proxies([str(tmp_path / "missing.txt"), str(good)], "http", stats))
+    assert [(item.ip, item.port) for item in items] == [("1.2.3.4", 8080)]
+    assert stats["unreadable_files"] == 1
+    assert "missing.txt" in capsys.readouterr().err
+
+
+def test_validate_exits_non_zero_when_an_input_cannot_be_read(tmp_path, capsys):
+    assert main(["validate", str(tmp_path / "missing.txt"), "--no-anonymity"]) == 1
+    assert "Cannot read" in capsys.readouterr().err
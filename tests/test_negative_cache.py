@@ -0,0 +1,74 @@
+import json
+
+from app.backend.negative_cache import NegativeCache
+
+KEY = ("1.2.3.4", 8080, "http")
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("base_backoff_seconds", 100)
+    kwargs.setdefault("max_backoff_seconds", 1000)
+    kwargs.setdefault("jitter", 0.0)
+    return NegativeCache(path=str(tmp_path / "negative.json"), **kwargs)
+
+
+def retry_at(cache, key=KEY):
+    return cache._entries[key][1]
+
+
+def test_backoff_doubles_per_failure_and_is_capped(tmp_path):
+    cache = make_cache(tmp_path)
+    assert [cache.backoff_seconds(failures) for failures in (1, 2, 3, 4, 5)] == [100, 200, 400, 800, 1000]
+
+
+def test_jitter_stays_within_bounds(tmp_path):
+    cache = make_cache(tmp_path, jitter=0.25)
+    delays = [cache.backoff_seconds(2) for _ in range(200)]
+    assert all(150 <= delay <= 250 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_failed_proxy_is_suppressed_until_backoff_expires(tmp_path):
+    cache = make_cache(tmp_path)
+    assert not cache.is_suppressed(KEY)
+    cache.record_failure([KEY])
+    assert cache.is_suppressed(KEY)
+    assert not cache.is_suppressed(KEY, now=retry_at(cache) + 1)
+    assert cache.get_stats()["skipped"] == 1
+
+
+def test_success_clears_the_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.record_failure([KEY]); cache.record_failure([KEY])
+    cache.record_success([KEY])
+    assert not cache.is_suppressed(KEY)
+    cache.record_failure([KEY]) # Starts again from the first backoff step
+    assert cache._entries[KEY][0] == 1
+
+
+def test_lru_bound_evicts_least_recently_failed(tmp_path):
+    cache = make_cache(tmp_path, capacity=2)
+    keys = [("10.0.0.1", 80, "http"), ("10.0.0.2", 80, "http"), ("10.0.0.3", 80, "http")]
+    cache.record_failure([keys[0]]); cache.record_failure([keys[1]])
+    cache.record_failure([keys[0]]) # Refreshes keys[0]
+    cache.record_failure([keys[2]])
+    assert set(cache._entries) == {keys[0], keys[2]}
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_entries_survive_a_reload(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.record_failure([KEY]); cache.record_failure([KEY])
+    cache.save()
+    reloaded = make_cache(tmp_path)
+    assert reloaded._entries[KEY][0] == 2
+    assert reloaded.is_suppressed(KEY)
+
+
+def test_malformed_cache_files_are_ignored(tmp_path):
+    path = tmp_path / "negative.json"
+    for content in ('[["1.2.3.4", 80, "http", 1]]', '{"not": "a list"}', "not json", '[7, null, ["x", "y", "z", 1, 2]]'):
+        path.write_text(content)
+        assert make_cache(tmp_path).get_stats()["entries"] == 0
+    path.write_text(json.dumps([["1.2.3.4", 80, "http", 1, 5.0], ["bad"]]))
+    assert make_cache(tmp_path).get_stats()["entries"] == 1
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.backend.models import ProxyItem
+from app.backend.pool_snapshot import RESPONSE_FIELDS, PoolSnapshotReader, PoolSnapshotWriter, default_snapshot_path
+from app.backend.serving import RemoteScheduler
+
+TRACE = [0.0, 10.0, 0.0, 0.0, 20.0, 30.0]
+
+
+def pool():
+    return [
+        ProxyItem(ip="10.0.0.1", port=8080, protocol="http", source="test", country="DE", is_valid=True,
+                  response_time=120.5, probe_trace=TRACE),
+        ProxyItem(ip="10.0.0.2", port=1080, protocol="socks5", source="test", verified_protocols=["socks5"]),
+    ]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "pool.snapshot")
+
+
+def test_bodies_are_published_once_and_served_as_bytes(snapshot_path):
+    writer = PoolSnapshotWriter(snapshot_path)
+    reader = PoolSnapshotReader(snapshot_path)
+    assert reader.get_proxies_body() == b"[]" # Nothing published yet
+    writer.publish(pool())
+
+    all_rows = json.loads(reader.get_proxies_body(only_valid=False))
+    assert [(row["ip"], row["is_valid"]) for row in all_rows] == [("10.0.0.1", True), ("10.0.0.2", False)]
+    assert all(tuple(row) == RESPONSE_FIELDS for row in all_rows) # No probe_trace in the body
+    assert json.loads(reader.get_proxies_body()) == all_rows[:1]
+    assert reader.get_info()["current_proxy_count"] == 2 and reader.get_info()["valid_proxy_count"] == 1
+
+
+def test_reader_follows_new_versions_and_keeps_traces(snapshot_path):
+    writer = PoolSnapshotWriter(snapshot_path)
+    reader = PoolSnapshotReader(snapshot_path)
+    writer.publish(pool())
+    proxies = reader.get_proxies(only_valid=False)
+    assert [p.probe_trace for p in proxies] == [TRACE, None]
+    assert reader.version == 1
+
+    writer.publish(pool()[1:])
+    assert reader.version == 2
+    assert json.loads(reader.get_proxies_body()) == []
+    assert [p.ip for p in reader.get_proxies(only_valid=False)] == ["10.0.0.2"]
+
+
+def test_default_path_is_per_serving_port():
+    assert default_snapshot_path(8000).endswith("proxy_pool.8000.snapshot")
+    assert default_snapshot_path(8000) != default_snapshot_path(8001)
+
+
+def test_worker_serves_the_same_json_as_the_scheduler_process(snapshot_path, monkeypatch):
+    from app.backend import main
+
+    assert RESPONSE_FIELDS == tuple(getattr(main.ProxyItemResponse, "model_fields", None) or main.ProxyItemResponse.__fields__)
+    PoolSnapshotWriter(snapshot_path).publish(pool())
+    client = main.app.test_client()
+    monkeypatch.setattr(main.scheduler, "_current_proxies", pool())
+    expected = {arg: client.get(f"/proxies?only_valid={arg}").get_json() for arg in ("true", "false")}
+
+    monkeypatch.setattr(main, "IS_API_WORKER", True)
+    monkeypatch.setattr(main, "scheduler", RemoteScheduler(("127.0.0.1", 0), b"", snapshot_path))
+    for arg, rows in expected.items():
+        response = client.get(f"/proxies?only_valid={arg}")
+        assert response.mimetype == "application/json"
+        assert response.get_json() == rows
@@ -0,0 +1,159 @@
+import json
+import socketserver
+import struct
+import threading
+
+import pytest
+
+from app.backend.models import ProxyItem
+from app.backend.probe_trace import ProbeError, TRACE_PHASES, summarize_traces, trace_as_dict, traced_get
+
+BODY = json.dumps({"ip": "198.51.100.7", "country": "DE"}).encode("utf-8")
+
+
+def _read_request(sock) -> bytes:
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk: break
+        data += chunk
+    return data
+
+
+def _respond(sock, path: str):
+    """Plays the origin server for the request target's path."""
+    if path.endswith("/json"):
+        sock.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(BODY) + BODY)
+    elif path.endswith("/chunked"):
+        chunks = b"".join(b"%x\r\n%s\r\n" % (len(part), part) for part in (BODY[:10], BODY[10:]))
+        sock.sendall(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + chunks + b"0\r\n\r\n")
+    elif path.endswith("/truncated"):
+        sock.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(BODY) + BODY[:10])
+    elif "/redirect/" in path:
+        hops_left = int(path.rsplit("/", 1)[1])
+        location = b"/json" if hops_left <= 1 else b"/redirect/%d" % (hops_left - 1)
+        sock.sendall(b"HTTP/1.1 302 Found\r\nLocation: " + location + b"\r\nContent-Length: 0\r\n\r\n")
+    else:
+        sock.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+
+
+class _FakeHttpProxy(socketserver.BaseRequestHandler):
+    def handle(self):
+        request_line = _read_request(self.request).split(b"\r\n", 1)[0].decode("ascii")
+        self.server.request_lines.append(request_line)
+        _respond(self.request, request_line.split(" ")[1])
+
+
+class _FakeSocks5Proxy(socketserver.BaseRequestHandler):
+    """Accepts the tunnel and then answers the tunnelled request itself."""
+
+    def handle(self):
+        if self.request.recv(3) != b"\x05\x01\x00": return
+        self.request.sendall(b"\x05\x00")
+        request = self.request.recv(10)
+        if request[:4] != b"\x05\x01\x00\x01": return
+        self.server.tunnel_targets.append((".".join(str(b) for b in request[4:8]), struct.unpack(">H", request[8:10])[0]))
+        self.request.sendall(b"\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00")
+        request_line = _read_request(self.request).split(b"\r\n", 1)[0].decode("ascii")
+        self.server.request_lines.append(request_line)
+        _respond(self.request, request_line.split(" ")[1])
+
+
+def _serve(handler):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.request_lines = []
+    server.tunnel_targets = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def http_proxy():
+    server = _serve(_FakeHttpProxy)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def socks5_proxy():
+    server = _serve(_FakeSocks5Proxy)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def proxy_for(server, protocol="http"):
+    return ProxyItem(ip="127.0.0.1", port=server.server_address[1], protocol=protocol, source="test")
+
+
+def test_http_proxy_gets_an_absolute_uri(http_proxy):
+    status, body, trace = traced_get(proxy_for(http_proxy), "http://example.test/json", 2, {})
+    assert (status, body) == (200, BODY)
+    assert http_proxy.request_lines == ["GET http://example.test/json HTTP/1.1"]
+    timings = trace_as_dict(trace.to_list())
+    assert timings["failed_phase"] is None
+    assert [timings["phases_ms"][phase] for phase in ("dns", "tunnel", "tls")] == [0.0, 0.0, 0.0] # Not needed
+    assert all(timings["phases_ms"][phase] is not None for phase in ("connect", "ttfb", "total"))
+
+
+def test_socks5_tunnel_resolves_the_target_locally(socks5_proxy):
+    status, body, trace = traced_get(proxy_for(socks5_proxy, "socks5"), "http://localhost:8080/json", 2, {})
+    assert (status, body) == (200, BODY)
+    assert socks5_proxy.tunnel_targets == [("127.0.0.1", 8080)]
+    assert socks5_proxy.request_lines == ["GET /json HTTP/1.1"]
+    assert all(value is not None for value in trace.to_list())
+    assert trace.timings["tls"] == 0.0
+
+
+def test_redirect_chain_is_followed(http_proxy):
+    status, body, trace = traced_get(proxy_for(http_proxy), "http://example.test/redirect/3", 2, {})
+    assert (status, body) == (200, BODY)
+    assert http_proxy.request_lines == [f"GET http://example.test{path} HTTP/1.1"
+                                        for path in ("/redirect/3", "/redirect/2", "/redirect/1", "/json")]
+
+
+def test_chunked_body_is_decoded(http_proxy):
+    status, body, _ = traced_get(proxy_for(http_proxy), "http://example.test/chunked", 2, {})
+    assert (status, body) == (200, BODY)
+
+
+def test_truncated_body_fails_in_the_total_phase(http_proxy):
+    with pytest.raises(ProbeError) as excinfo:
+        traced_get(proxy_for(http_proxy), "http://example.test/truncated", 2, {})
+    assert excinfo.value.phase == "total"
+    timings = trace_as_dict(excinfo.value.trace.to_list())
+    assert timings["failed_phase"] == "total"
+    assert timings["phases_ms"]["ttfb"] is not None
+
+
+def test_summarize_traces_skips_untraced_and_unneeded_phases():
+    proxies = [
+        ProxyItem(ip="10.0.0.1", port=1, protocol="http", source="test", probe_trace=[0.0, 10.0, 0.0, 0.0, 20.0, 30.0]),
+        ProxyItem(ip="10.0.0.2", port=2, protocol="http", source="test", probe_trace=[0.0, 14.0, 0.0, 0.0, None, None]),
+        ProxyItem(ip="10.0.0.3", port=3, protocol="http", source="test"),
+    ]
+    summary = summarize_traces(proxies)
+    assert summary["traced"] == 2
+    assert set(summary["phases"]) == {"connect", "ttfb", "total"}
+    assert summary["phases"]["connect"] == {"count": 2, "mean_ms": 12.0, "p50_ms": 14.0, "p95_ms": 14.0}
+    assert summary["failed_phase_counts"] == {"ttfb": 1}
+    assert trace_as_dict(None) is None
+
+
+def test_trace_endpoint(monkeypatch):
+    from app.backend import main
+
+    traced = ProxyItem(ip="10.0.0.1", port=8080, protocol="http", source="test", is_valid=True,
+                       probe_trace=[0.0, 10.0, 0.0, 0.0, 20.0, 30.0])
+    untraced = ProxyItem(ip="10.0.0.2", port=8080, protocol="http", source="test", is_valid=True)
+    monkeypatch.setattr(main.scheduler, "_current_proxies", [traced, untraced])
+    client = main.app.test_client()
+
+    response = client.get("/proxies/http-10.0.0.1-8080/trace")
+    assert response.status_code == 200
+    assert response.get_json() == {"id": "http-10.0.0.1-8080", "failed_phase": None,
+                                   "phases_ms": dict(zip(TRACE_PHASES, traced.probe_trace))}
+    assert client.get("/proxies/http-10.0.0.2-8080/trace").status_code == 404 # Not traced
+    assert client.get("/proxies/http-10.0.0.3-8080/trace").status_code == 404 # Unknown
@@ -0,0 +1,88 @@
+import socketserver
+import threading
+
+import pytest
+
+from app.backend.protocol_probe import classify_reply, fingerprint_protocols, _protocols_from_connect_reply, preferred_protocol
+
+
+def test_classify_reply_identifies_protocol_families():
+    assert classify_reply(b"HTTP/1.1 200 Connection established\r\n\r\n") == "http"
+    assert classify_reply(b"\x05\x00") == "socks5"
+    assert classify_reply(b"\x05\xff") == "socks5" # Still SOCKS5, even if it wants credentials
+    assert classify_reply(b"\x00\x5a\x00\x50\x01\x02\x03\x04") == "socks4"
+    assert classify_reply(b"\x00\x5b\x00\x00\x00\x00\x00\x00") == "socks4"
+
+
+def test_classify_reply_rejects_unknown_or_short_replies():
+    assert classify_reply(b"") is None
+    assert classify_reply(b"\x05") is None
+    assert classify_reply(b"\x00\x01") is None
+    assert classify_reply(b"SSH-2.0-OpenSSH_9.6\r\n") is None
+
+
+def test_connect_reply_2xx_means_http_and_https():
+    assert _protocols_from_connect_reply(b"HTTP/1.1 200 Connection established\r\n\r\n") == {"http", "https"}
+
+
+def test_connect_reply_refusal_still_speaks_http():
+    assert _protocols_from_connect_reply(b"HTTP/1.1 405 Method Not Allowed\r\n\r\n") == {"http"}
+
+
+def test_connect_reply_needing_credentials_or_garbled_is_unusable():
+    assert _protocols_from_connect_reply(b"HTTP/1.1 407 Proxy Authentication Required\r\n\r\n") == set()
+    assert _protocols_from_connect_reply(b"HTTP/1.1\r\n\r\n") == set()
+    assert _protocols_from_connect_reply(b"") == set()
+
+
+def test_preferred_protocol_order():
+    assert preferred_protocol({"socks4", "http", "socks5"}) == "socks5"
+    assert preferred_protocol({"https", "http"}) == "http"
+    assert preferred_protocol(set()) is None
+
+
+class _StrictSocks4Proxy(socketserver.BaseRequestHandler):
+    """Reads a whole SOCKS4 request (up to the userid's NUL) before answering, as strict servers do."""
+
+    def handle(self):
+        data = b""
+        while len(data) < 9 or not data.endswith(b"\x00"):
+            chunk = self.request.recv(512)
+            if not chunk: return
+            data += chunk
+        if data[0] == 0x04: self.request.sendall(b"\x00\x5a\x00\x50\x01\x01\x01\x01")
+
+
+class _SilentToHttpSocks5Proxy(socketserver.BaseRequestHandler):
+    """Speaks SOCKS5 but never answers anything else."""
+
+    def handle(self):
+        greeting = self.request.recv(512)
+        if greeting[:1] == b"\x05": self.request.sendall(b"\x05\x00")
+        else: self.request.recv(512) # Waits for the client to give up
+
+
+def _serve(handler):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def server_port(request):
+    server = _serve(request.param)
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("server_port", [_StrictSocks4Proxy], indirect=True)
+def test_strict_socks4_server_is_fingerprinted_when_labelled(server_port):
+    assert fingerprint_protocols("127.0.0.1", server_port, timeout=0.5, labelled_protocols=["socks4"]) == {"socks4"}
+    assert fingerprint_protocols("127.0.0.1", server_port, timeout=0.5, labelled_protocols=["http", "socks4"]) == {"socks4"}
+
+
+@pytest.mark.parametrize("server_port", [_SilentToHttpSocks5Proxy], indirect=True)
+def test_silent_greeting_moves_on_to_the_next_one(server_port):
+    assert fingerprint_protocols("127.0.0.1", server_port, timeout=0.5, labelled_protocols=["http"]) == {"socks5"}
@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pytest
+
+from app.backend.models import ProxyItem
+from app.backend.providers.base import ProxyProviderBase
+from app.backend.providers.cache import ProviderCache
+
+ETAG = '"v1"'
+
+
+class _ListHandler(BaseHTTPRequestHandler):
+    requests_seen: List[str] = []
+
+    def do_GET(self):
+        conditional = self.headers.get("If-None-Match") == ETAG
+        type(self).requests_seen.append("conditional" if conditional else "full")
+        if conditional:
+            self.send_response(304); self.send_header("ETag", ETAG); self.end_headers()
+            return
+        body = b"1.2.3.4:80\n5.6.7.8:3128\n"
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def list_server():
+    _ListHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ListHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/list.txt"
+    server.shutdown()
+    server.server_close()
+
+
+class _TextListProvider(ProxyProviderBase):
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.parse_calls = 0
+
+    def parse_proxies(self, body: str) -> List[ProxyItem]:
+        self.parse_calls += 1
+        items = []
+        for line in body.split():
+            ip, port = line.split(":")
+            items.append(ProxyItem(ip=ip, port=int(port), protocol="http", source="test"))
+        return items
+
+    def fetch_proxies(self) -> List[ProxyItem]:
+        return self.fetch_url_cached(self.url, 5, self.parse_proxies)
+
+
+def test_stale_entry_is_revalidated_and_reused_on_304(list_server, tmp_path):
+    cache = ProviderCache(str(tmp_path))
+    provider = _TextListProvider(list_server, cache=cache, cache_ttl_seconds=0)
+    first = provider.fetch_proxies()
+    second = provider.fetch_proxies()
+    assert _ListHandler.requests_seen == ["full", "conditional"]
+    assert provider.parse_calls == 1 # The 304 reuses the parsed items
+    assert second == first
+    assert cache.get_stats()["misses"] == 1 and cache.get_stats()["not_modified"] == 1
+
+
+def test_fresh_entry_is_served_without_a_request(list_server, tmp_path):
+    cache = ProviderCache(str(tmp_path))
+    provider = _TextListProvider(list_server, cache=cache, cache_ttl_seconds=600)
+    provider.fetch_proxies(); provider.fetch_proxies()
+    assert _ListHandler.requests_seen == ["full"]
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_cache_reloads_from_disk(list_server, tmp_path):
+    _TextListProvider(list_server, cache=ProviderCache(str(tmp_path)), cache_ttl_seconds=0).fetch_proxies()
+    restarted = _TextListProvider(list_server, cache=ProviderCache(str(tmp_path)), cache_ttl_seconds=0)
+    assert len(restarted.fetch_proxies()) == 2
+    assert _ListHandler.requests_seen == ["full", "conditional"]
+    assert restarted.parse_calls == 0
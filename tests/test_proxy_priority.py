@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.backend import proxy_validator
+from app.backend.models import ProxyItem
+from app.backend.proxy_priority import PriorityHistory, ProxyPriorityQueue, last_checked_age_seconds
+
+
+def test_relative_ages():
+    assert last_checked_age_seconds("5 mins ago") == 300.0
+    assert last_checked_age_seconds("1 hour ago") == 3600.0
+
+
+def test_naive_and_offset_aware_timestamps():
+    ten_minutes_ago = datetime.now() - timedelta(minutes=10)
+    assert abs(last_checked_age_seconds(ten_minutes_ago.isoformat()) - 600) < 5
+    utc_ten_minutes_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+    assert abs(last_checked_age_seconds(utc_ten_minutes_ago.isoformat()) - 600) < 5
+    assert abs(last_checked_age_seconds(utc_ten_minutes_ago.strftime("%Y-%m-%dT%H:%M:%SZ")) - 600) < 5
+
+
+def test_unparseable_values_have_no_age():
+    assert last_checked_age_seconds(None) is None
+    assert last_checked_age_seconds("yesterday-ish") is None
+
+
+def item(port, is_valid=False, response_time=None):
+    return ProxyItem(ip="10.0.0.1", port=port, protocol="http", source="test", is_valid=is_valid, response_time=response_time)
+
+
+def counting(items, consumed):
+    for candidate in items:
+        consumed[0] += 1
+        yield candidate
+
+
+def test_queue_pops_previously_valid_and_fast_first_and_previously_invalid_last():
+    history = PriorityHistory([item(1, True, 900.0), item(2, True, 200.0), item(3, False)])
+    candidates = [item(3), item(4), item(1), item(2)]
+    queue = ProxyPriorityQueue(candidates, history=history)
+    assert [queue.pop().port for _ in candidates] == [2, 1, 4, 3]
+    assert queue.pop() is None
+
+
+def test_capacity_bounds_how_much_of_the_source_is_consumed():
+    consumed = [0]
+    queue = ProxyPriorityQueue(counting([item(port) for port in range(1, 101)], consumed), capacity=5)
+    for popped in range(1, 11):
+        assert queue.pop() is not None
+        assert consumed[0] <= popped + 5 - 1
+        assert len(queue) <= 5
+    assert consumed[0] < 100
+
+
+def test_submission_window_never_exceeds_its_bound(monkeypatch):
+    outstanding = [0]
+    max_outstanding = [0]
+    lock = threading.Lock()
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            with lock: # Counted before submitting, so a fast probe cannot finish first
+                outstanding[0] += 1
+                max_outstanding[0] = max(max_outstanding[0], outstanding[0])
+            future = super().submit(fn, *args, **kwargs)
+            def done(_):
+                with lock: outstanding[0] -= 1
+            future.add_done_callback(done)
+            return future
+
+    def fake_probe(proxy_item, *args):
+        time.sleep(random.uniform(0, 0.01))
+        return proxy_item
+
+    monkeypatch.setattr(proxy_validator, "ThreadPoolExecutor", CountingExecutor)
+    monkeypatch.setattr(proxy_validator, "test_single_proxy", fake_probe)
+    num_threads = 3
+    results = list(proxy_validator.iter_validated_proxies([item(port) for port in range(1, 201)], num_threads=num_threads))
+    assert len(results) == 200
+    assert max_outstanding[0] == num_threads * proxy_validator.SUBMIT_WINDOW_PER_THREAD
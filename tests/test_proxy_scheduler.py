@@ -0,0 +1,97 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from app.backend import proxy_scheduler, proxy_validator
+from app.backend.models import ProxyItem
+from app.backend.negative_cache import NegativeCache
+from app.backend.proxy_scheduler import ProxyScheduler
+from app.backend.proxy_validator import validate_all_proxies
+
+
+@pytest.fixture
+def hanging_proxy_ports():
+    """Listeners that never accept: connections succeed, requests never get an answer."""
+    listeners = [socket.socket() for _ in range(6)]
+    for listener in listeners:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(8)
+    yield [listener.getsockname()[1] for listener in listeners]
+    for listener in listeners: listener.close() # Resets the queued connections so abandoned probes end
+
+
+def hanging_proxies(ports):
+    return [ProxyItem(ip="127.0.0.1", port=port, protocol="http", source="test") for port in ports]
+
+
+def make_scheduler():
+    return ProxyScheduler(negative_cache=NegativeCache(path=None), fingerprint_protocols=False)
+
+
+def item(port, protocol="http", is_valid=True, ip="10.0.0.1"):
+    return ProxyItem(ip=ip, port=port, protocol=protocol, source="test", is_valid=is_valid)
+
+
+def test_deadline_returns_promptly_while_probes_hang(hanging_proxy_ports):
+    run_stats = {}
+    started = time.monotonic()
+    results = validate_all_proxies(hanging_proxies(hanging_proxy_ports), num_threads=2, timeout=30,
+                                   test_url="http://example.test/json", check_anonymity=False,
+                                   deadline_seconds=1, run_stats=run_stats)
+    assert time.monotonic() - started < 5
+    assert results == []
+    assert run_stats["stop_reason"] == "deadline"
+    assert run_stats["abandoned"] == 6
+
+
+def test_cancel_validation_stops_the_running_sweep(hanging_proxy_ports, monkeypatch):
+    monkeypatch.setattr(proxy_validator, "get_all_proxies", lambda: hanging_proxies(hanging_proxy_ports))
+    scheduler = make_scheduler()
+    assert scheduler.cancel_validation() == "No validation in progress."
+    run = threading.Thread(target=scheduler._perform_validation)
+    run.start()
+    deadline = time.monotonic() + 5
+    while not scheduler.get_status()["validation_in_progress"] and time.monotonic() < deadline: time.sleep(0.05)
+    time.sleep(0.5)
+
+    assert scheduler.cancel_validation() == "Validation cancel requested."
+    run.join(timeout=5)
+    assert not run.is_alive()
+    status = scheduler.get_status()
+    assert not status["validation_in_progress"]
+    assert status["last_run_stats"]["stop_reason"] == "cancelled"
+    assert status["last_run_stats"]["abandoned"] == 6
+
+
+def run_with_results(monkeypatch, scheduler, results, stop_reason):
+    def fake_validate_all_proxies(run_stats, **kwargs):
+        run_stats.update({"stop_reason": stop_reason, "completed": len(results)})
+        return list(results)
+    monkeypatch.setattr(proxy_scheduler, "validate_all_proxies", fake_validate_all_proxies)
+    scheduler._perform_validation()
+    return {(p.ip, p.port, p.protocol): p.is_valid for p in scheduler.get_proxies(only_valid=False)}
+
+
+def test_partial_run_keeps_unprobed_rows_and_replaces_probed_ones(monkeypatch):
+    scheduler = make_scheduler()
+    scheduler._current_proxies = [item(1), item(2), item(3, "socks4")]
+    pool = run_with_results(monkeypatch, scheduler, [item(2, is_valid=False), item(3, "socks5")], "deadline")
+    assert pool == {("10.0.0.1", 1, "http"): True, ("10.0.0.1", 2, "http"): False,
+                    ("10.0.0.1", 3, "socks4"): True, ("10.0.0.1", 3, "socks5"): True}
+
+
+def test_fingerprinted_partial_run_drops_other_protocol_rows_of_probed_endpoints(monkeypatch):
+    scheduler = make_scheduler()
+    scheduler.fingerprint_protocols = True
+    scheduler._current_proxies = [item(1), item(2), item(3, "socks4"), item(3, "http")]
+    pool = run_with_results(monkeypatch, scheduler, [item(2, is_valid=False), item(3, "socks5")], "cancelled")
+    assert pool == {("10.0.0.1", 1, "http"): True, ("10.0.0.1", 2, "http"): False, ("10.0.0.1", 3, "socks5"): True}
+
+
+def test_complete_run_replaces_the_pool(monkeypatch):
+    scheduler = make_scheduler()
+    scheduler._current_proxies = [item(1), item(2)]
+    pool = run_with_results(monkeypatch, scheduler, [item(2, is_valid=False)], None)
+    assert pool == {("10.0.0.1", 2, "http"): False}
@@ -0,0 +1,143 @@
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+from app.backend import proxy_sharding
+from app.backend.models import ProxyItem
+from app.backend.proxy_sharding import ShardCoordinator, iter_sharded_validated_proxies, run_shard_worker, split_into_shards
+from app.backend.proxy_validator import validate_all_proxies
+
+TEST_URL = "http://example.test/json"
+
+
+class _FakeHttpProxy(socketserver.BaseRequestHandler):
+    """Answers absolute-URI GETs like an HTTP proxy fetching an ipinfo-style endpoint."""
+
+    def handle(self):
+        request = self.request.recv(4096)
+        if not request.startswith(b"GET http://"): return
+        body = json.dumps({"ip": "198.51.100.7", "country": "DE"}).encode("utf-8")
+        self.request.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+
+
+@pytest.fixture(scope="module")
+def fake_proxy_port():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeHttpProxy)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def closed_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for sock in sockets: sock.bind(("127.0.0.1", 0))
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets: sock.close()
+    return ports
+
+
+def candidates(fake_proxy_port, dead=8):
+    items = [ProxyItem(ip="127.0.0.1", port=fake_proxy_port, protocol="http", source="test")]
+    items += [ProxyItem(ip="127.0.0.1", port=port, protocol="http", source="test") for port in closed_ports(dead)]
+    return items
+
+
+def validate(items, **kwargs):
+    run_stats = {}
+    results = validate_all_proxies(items, num_threads=4, timeout=2, test_url=TEST_URL, check_anonymity=False,
+                                   run_stats=run_stats, fingerprint=False, **kwargs)
+    return results, run_stats
+
+
+def test_split_into_shards_is_stable_and_complete():
+    items = [ProxyItem(ip=f"10.0.0.{i}", port=8000 + i, protocol="http", source="test") for i in range(50)]
+    shards = split_into_shards(items, 4)
+    assert sorted(item.port for shard in shards for item in shard) == [item.port for item in items]
+    assert [[item.port for item in shard] for shard in split_into_shards(list(reversed(items)), 4)] == \
+           [[item.port for item in reversed(shard)] for shard in shards]
+
+
+def test_local_workers_validate_every_candidate(fake_proxy_port):
+    items = candidates(fake_proxy_port)
+    results, run_stats = validate(items, shard_processes=2)
+    assert len(results) == len(items)
+    assert [p.port for p in results if p.is_valid] == [fake_proxy_port]
+    assert run_stats["stop_reason"] is None
+    assert run_stats["shards"]["completed"] == run_stats["shards"]["total"]
+    assert run_stats["shards"]["workers"] >= 1
+
+
+def test_remote_worker_connects_with_retry_and_stays_across_runs(fake_proxy_port):
+    authkey = os.urandom(16)
+    port = closed_ports(1)[0]
+    # A local process stands in for a remote worker; it starts before the coordinator exists
+    worker = multiprocessing.get_context("spawn").Process(
+        target=run_shard_worker, args=(("127.0.0.1", port), authkey), kwargs={"reconnect": True}, daemon=True)
+    worker.start()
+    coordinator = None
+    try:
+        time.sleep(1.5)
+        coordinator = ShardCoordinator(("127.0.0.1", port), authkey)
+        deadline = time.monotonic() + 20
+        while coordinator.connected_workers() == 0 and time.monotonic() < deadline: time.sleep(0.2)
+        assert coordinator.connected_workers() == 1
+
+        for _ in range(2):
+            results, run_stats = validate(candidates(fake_proxy_port, dead=4), shard_coordinator=coordinator)
+            assert run_stats["stop_reason"] is None
+            assert len(results) == 5 and sum(p.is_valid for p in results) == 1
+            assert coordinator.connected_workers() == 1 # Still connected between runs
+    finally:
+        if coordinator: coordinator.close()
+        worker.terminate(); worker.join(timeout=5)
+
+
+def test_run_stops_when_no_worker_is_connected(fake_proxy_port, monkeypatch):
+    monkeypatch.setattr(proxy_sharding, "WORKER_JOIN_GRACE_SECONDS", 0.5)
+    coordinator = ShardCoordinator(("127.0.0.1", 0), os.urandom(16))
+    try:
+        results, run_stats = validate(candidates(fake_proxy_port, dead=2), shard_coordinator=coordinator)
+    finally:
+        coordinator.close()
+    assert results == []
+    assert run_stats["stop_reason"] == "no_workers"
+    assert run_stats["abandoned"] == 3
+
+
+def test_run_with_a_failed_shard_is_reported_as_partial(fake_proxy_port):
+    coordinator = ShardCoordinator(("127.0.0.1", 0), os.urandom(16))
+
+    def crashing_worker():
+        # Takes the shard and drops the connection, as many times as the coordinator retries it
+        for _ in range(proxy_sharding.MAX_SHARD_ATTEMPTS):
+            with Client(coordinator.connect_address, authkey=coordinator.authkey) as conn:
+                conn.send(("hello", {"pid": 0, "host": "test", "persistent": True}))
+                assert conn.recv()[0] == "shard"
+
+    worker = threading.Thread(target=crashing_worker, daemon=True)
+    worker.start()
+    run_stats = {}
+    try:
+        results = list(iter_sharded_validated_proxies(
+            candidates(fake_proxy_port, dead=2), num_threads=2, timeout=2, test_url=TEST_URL, anonymity_test_url=TEST_URL,
+            check_anonymity=False, run_stats=run_stats, num_shards=1, coordinator=coordinator))
+    finally:
+        coordinator.close()
+    worker.join(timeout=5)
+    assert results == []
+    assert run_stats["shards"]["failed"] == 1
+    assert run_stats["stop_reason"] == "shards_failed"
+
+
+def test_coordinator_requires_a_key():
+    with pytest.raises(ValueError):
+        ShardCoordinator(("127.0.0.1", 0), None)